@@ -0,0 +1,96 @@
+"""
+Startup-time regression benchmark for the hAPI CLI.
+
+Runs `python -X importtime hAPI/cli.py <args>` several times, reports the wall time and the slowest imports,
+and fails if the median wall time exceeds a budget or if a heavy dependency is imported on the help path.
+
+Usage:
+    python3 benchmarks/bench_startup.py [--runs 10] [--max-ms 300] [--json] [-- <cli arguments>]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hAPI", "cli.py")
+
+# Dependencies that must not be imported just to print the help
+HEAVY_IMPORTS = ["requests", "urllib3", "yaml", "jinja2", "numpy", "orjson", "ijson"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(cli_args):
+    """Runs the CLI once. Returns (wall time in ms, {module: (self us, cumulative us, depth)})."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI_PATH] + cli_args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    imports = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports[module] = (int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+    return wall_ms, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hAPI CLI startup benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs (default: 10)")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median wall time exceeds this many milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show (default: 10)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("cli_args", nargs=argparse.REMAINDER, help="Arguments passed to cli.py (default: -h)")
+    args = parser.parse_args()
+
+    cli_args = [arg for arg in args.cli_args if arg != "--"] or ["-h"]
+    wall_times = []
+    imports = {}
+    for _ in range(max(1, args.runs)):
+        wall_ms, imports = run_once(cli_args)
+        wall_times.append(wall_ms)
+
+    top_level = {module: cumulative for module, (_, cumulative, depth) in imports.items() if depth == 0}
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    heavy = [module for module in HEAVY_IMPORTS if module in imports] if cli_args == ["-h"] else []
+
+    result = {
+        "cli_args": cli_args,
+        "runs": len(wall_times),
+        "median_ms": round(statistics.median(wall_times), 2),
+        "min_ms": round(min(wall_times), 2),
+        "import_ms": round(sum(top_level.values()) / 1000, 2),
+        "slowest_imports": [{"module": module, "cumulative_ms": round(us / 1000, 2)} for module, us in slowest],
+        "heavy_imports": heavy,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        print(f"hAPI startup ({' '.join(cli_args)}), {result['runs']} runs")
+        print(f"  median wall time: {result['median_ms']} ms (min {result['min_ms']} ms)")
+        print(f"  total import time: {result['import_ms']} ms")
+        print("  slowest top-level imports:")
+        for entry in result["slowest_imports"]:
+            print(f"    {entry['cumulative_ms']:>8} ms  {entry['module']}")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy dependencies imported on the help path: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and result["median_ms"] > args.max_ms:
+        print(f"FAIL: median wall time {result['median_ms']} ms exceeds the budget of {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
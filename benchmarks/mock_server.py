@@ -0,0 +1,266 @@
+"""
+Local stand-in API for benchmarks and manual testing of hAPI.
+
+Serves a synthetic OpenAPI spec with a configurable number of paths and answers requests to them. It can
+inject latency, rate limit the sensitive endpoints (429 + Retry-After above N requests per second), reflect
+the Origin header in CORS headers and protect some paths with HTTP Basic Auth.
+
+For the benchmark harness it also measures how long each keep-alive connection stays idle between sending
+a response and receiving the next request. That gap is time spent in the client.
+
+Usage:
+    python3 benchmarks/mock_server.py [--port 8000] [--paths 100] [--latency-ms 0] [--rate-limit 50]
+                                      [--basic-auth user:pass] [--spec-out spec.json]
+
+Endpoints besides the API:
+    GET /openapi.json   The synthetic OpenAPI spec
+    GET /__stats        Request count, status codes and client gap percentiles since the last reset, as JSON
+    POST /__reset       Resets the statistics
+"""
+import argparse
+import base64
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PATHS = 100
+
+# Methods the synthetic spec documents for every path, all others are answered with 405
+DOCUMENTED_METHODS = ("get", "post")
+ALLOWED_METHODS = {"GET", "POST", "HEAD", "OPTIONS"}
+
+# Endpoints the rate limiting module looks for
+SENSITIVE_PATHS = ["/api/v1/login", "/api/v1/auth/token"]
+
+# Every Nth resource path requires Basic Auth when it is enabled
+BASIC_AUTH_EVERY = 10
+
+
+def resource_path(index):
+    return f"/api/v1/resource{index}"
+
+
+def build_spec(path_count):
+    """Returns the synthetic OpenAPI spec: path_count resource paths plus the sensitive endpoints."""
+    operation = {"responses": {"200": {"description": "OK"}, "401": {"description": "Unauthorized"}}}
+    paths = {resource_path(index): {method: operation for method in DOCUMENTED_METHODS} for index in range(path_count)}
+    for path in SENSITIVE_PATHS:
+        paths[path] = {"post": {"responses": {"200": {"description": "OK"}, "429": {"description": "Too Many Requests"}}}}
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": f"Mock API {path_count}", "version": "1.0.0"},
+        "paths": paths,
+    }
+
+
+class MockStats:
+    """Counts the requests the server answered and the client gaps of its keep-alive connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.perf_counter()
+            self.requests = 0
+            self.status_codes = {}
+            self.gaps_ms = []
+
+    def record(self, status_code, gap_ms):
+        with self._lock:
+            self.requests += 1
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+            if gap_ms is not None:
+                self.gaps_ms.append(gap_ms)
+
+    def snapshot(self):
+        with self._lock:
+            gaps = sorted(self.gaps_ms)
+            elapsed = time.perf_counter() - self.started_at
+            return {
+                "requests": self.requests,
+                "elapsed_s": round(elapsed, 3),
+                "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+                "client_gap_ms": {
+                    f"p{percentile}": round(gaps[min(len(gaps) - 1, int(len(gaps) * percentile / 100))], 3) if gaps else None
+                    for percentile in (50, 90, 99)
+                },
+            }
+
+
+class RateLimiter:
+    """Fixed one-second window shared by all sensitive endpoints."""
+
+    def __init__(self, requests_per_second):
+        self.requests_per_second = requests_per_second
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def allow(self):
+        """Returns True if the request is allowed. Otherwise the client should retry in the next window."""
+        window = int(time.time())
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._count = 0
+            self._count += 1
+            return self._count <= self.requests_per_second
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockAPI/1.0"
+
+    # Headers and body are separate writes. With Nagle's algorithm the body waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self._last_response_at = None
+
+    def parse_request(self):
+        # Called as soon as the request line arrived
+        self._received_at = time.perf_counter()
+        return super().parse_request()
+
+    def __getattr__(self, name):
+        # Answer every verb, including non-standard ones like PROPFIND or QUERY
+        if name.startswith("do_"):
+            return self._handle
+        raise AttributeError(name)
+
+    def _handle(self):
+        server = self.server
+        gap_ms = None
+        if self._last_response_at is not None:
+            gap_ms = (self._received_at - self._last_response_at) * 1000
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/__stats":
+            self._respond(200, json.dumps(server.stats.snapshot()).encode("utf-8"))
+            return
+        if path == "/__reset":
+            server.stats.reset()
+            self._respond(204, b"")
+            return
+        if path == "/openapi.json":
+            self._respond(200, server.spec_bytes)
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        status_code, headers = self._route(path)
+        body = json.dumps({"status": status_code, "path": path}).encode("utf-8")
+        self._respond(status_code, body, headers)
+        server.stats.record(status_code, gap_ms)
+
+    def _route(self, path):
+        """Returns the status code and extra headers of a request to the API."""
+        server = self.server
+        headers = {}
+        origin = self.headers.get("Origin")
+        if origin and server.cors:
+            headers["Access-Control-Allow-Origin"] = origin
+            headers["Access-Control-Allow-Credentials"] = "true"
+
+        if path not in server.paths:
+            return 404, headers
+        if self.command not in ALLOWED_METHODS:
+            headers["Allow"] = ", ".join(sorted(ALLOWED_METHODS))
+            return 405, headers
+
+        if path in server.sensitive_paths and server.rate_limiter:
+            if not server.rate_limiter.allow():
+                headers["Retry-After"] = "1"
+                return 429, headers
+
+        if server.basic_auth and path in server.protected_paths:
+            if self.headers.get("Authorization") != server.basic_auth:
+                headers["WWW-Authenticate"] = 'Basic realm="mock"'
+                return 401, headers
+        return 200, headers
+
+    def _respond(self, status_code, body, headers=None):
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.wfile.flush()
+        self._last_response_at = time.perf_counter()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port=0, path_count=DEFAULT_PATHS, latency_ms=0, rate_limit=None, basic_auth=None, cors=True):
+        """
+        :param port: Port to listen on (0 picks a free one).
+        :param path_count: Number of resource paths in the synthetic spec.
+        :param latency_ms: Latency added to every API response.
+        :param rate_limit: Requests per second allowed to the sensitive endpoints before they answer 429.
+        :param basic_auth: "user:pass" required on every BASIC_AUTH_EVERY-th resource path.
+        :param cors: Reflect the Origin header in Access-Control-Allow-Origin.
+        """
+        super().__init__(("127.0.0.1", port), MockRequestHandler)
+        self.spec = build_spec(path_count)
+        self.spec_bytes = json.dumps(self.spec).encode("utf-8")
+        self.paths = set(self.spec["paths"])
+        self.sensitive_paths = set(SENSITIVE_PATHS)
+        self.protected_paths = {resource_path(index) for index in range(0, path_count, BASIC_AUTH_EVERY)}
+        self.latency = latency_ms / 1000
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.basic_auth = "Basic " + base64.b64encode(basic_auth.encode("utf-8")).decode("ascii") if basic_auth else None
+        self.cors = cors
+        self.stats = MockStats()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in API for hAPI benchmarks")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on, 0 picks a free one (default: 8000)")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS, help=f"Number of resource paths (default: {DEFAULT_PATHS})")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every response")
+    parser.add_argument("--rate-limit", type=int, help="Requests per second allowed to the sensitive endpoints before they answer 429")
+    parser.add_argument("--basic-auth", metavar="USER:PASS", help=f"Require Basic Auth on every {BASIC_AUTH_EVERY}th resource path")
+    parser.add_argument("--no-cors", action="store_true", help="Don't reflect the Origin header")
+    parser.add_argument("--spec-out", help="Write the synthetic OpenAPI spec to this file")
+    args = parser.parse_args()
+
+    server = MockAPIServer(args.port, args.paths, args.latency_ms, args.rate_limit, args.basic_auth, not args.no_cors)
+    if args.spec_out:
+        with open(args.spec_out, "w", encoding="utf-8") as file:
+            json.dump(server.spec, file)
+
+    # The harness reads the URL from the first line of output
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+End-to-end throughput benchmark for the hAPI modules.
+
+Starts the mock server (mock_server.py) for every spec size, runs each module against it in a separate
+hAPI process and reports:
+
+    requests/s      requests the server answered, divided by the wall time of the hAPI process
+    wall time       of the hAPI process, including startup and report generation
+    peak RSS        maximum resident set size of the hAPI process
+    p99 client gap  99th percentile of the time a keep-alive connection stayed idle between a response and the
+                    next request, i.e. time hAPI spent parsing, checking and scheduling between requests
+
+The server runs in its own process, so its CPU use doesn't skew hAPI's numbers. It is written in Python too,
+so absolute numbers are only comparable between runs on the same machine: use them to spot regressions, or
+compare against a saved run with --baseline.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py [--sizes 10,100,1000,10000] [--modules verb_tampering,cors]
+                                         [--latency-ms 0] [--json] [--save results.json]
+                                         [--baseline results.json --tolerance 20] [-- <extra cli arguments>]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI_PATH = os.path.join(BENCHMARKS_DIR, "..", "hAPI", "cli.py")
+MODULES_DIR = os.path.join(BENCHMARKS_DIR, "..", "hAPI", "modules")
+MOCK_SERVER_PATH = os.path.join(BENCHMARKS_DIR, "mock_server.py")
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Rate limit of the mock server's sensitive endpoints, so the rate limiting module has something to find
+RATE_LIMIT = 50
+BASIC_AUTH = "bench:bench"
+
+# Module-specific arguments, placed after the module name
+MODULE_ARGUMENTS = {
+    "basic_auth": ["--ba-username", "bench", "--ba-password", "bench"],
+}
+
+
+def available_modules():
+    """Lists the modules without importing hAPI, like its module loader."""
+    return sorted(
+        filename[:-3] for filename in os.listdir(MODULES_DIR)
+        if filename.endswith(".py") and not filename.startswith("_")
+    )
+
+
+def start_mock_server(path_count, latency_ms, spec_file):
+    """Starts the mock server in its own process. Returns (process, URL)."""
+    process = subprocess.Popen(
+        [sys.executable, MOCK_SERVER_PATH, "--port", "0", "--paths", str(path_count), "--latency-ms", str(latency_ms),
+         "--rate-limit", str(RATE_LIMIT), "--basic-auth", BASIC_AUTH, "--spec-out", spec_file],
+        stdout=subprocess.PIPE, text=True
+    )
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError("The mock server didn't start")
+    return process, url
+
+
+def server_request(url, path, method="GET"):
+    with urllib.request.urlopen(urllib.request.Request(f"{url}{path}", method=method), timeout=10) as response:
+        body = response.read()
+    return json.loads(body) if body else None
+
+
+def run_module(url, spec_file, module, extra_args, workdir):
+    """Runs one module in a hAPI process. Returns its result, or None if it failed."""
+    server_request(url, "/__reset", "POST")
+    command = [sys.executable, CLI_PATH, "-u", url, "-i", spec_file, "-f", "JSON", "--no-store"] + extra_args
+    command += [module] + MODULE_ARGUMENTS.get(module, [])
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # wait4 returns the resource usage of this child only, unlike getrusage(RUSAGE_CHILDREN)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_s = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode("utf-8", "replace")
+    process.stderr.close()
+
+    stats = server_request(url, "/__stats")
+    if process.returncode != 0:
+        print(f"  {module}: hAPI exited with status {process.returncode}\n{stderr}", file=sys.stderr)
+        return None
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "module": module,
+        "requests": stats["requests"],
+        "wall_s": round(wall_s, 3),
+        "requests_per_s": round(stats["requests"] / wall_s, 1) if wall_s else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "p99_client_gap_ms": stats["client_gap_ms"]["p99"],
+        "status_codes": stats["status_codes"],
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Returns a message for every module and size whose throughput dropped by more than tolerance percent."""
+    baseline_rates = {(entry["paths"], entry["module"]): entry["requests_per_s"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        before = baseline_rates.get((entry["paths"], entry["module"]))
+        if before and entry["requests_per_s"] is not None and entry["requests_per_s"] < before * (1 - tolerance / 100):
+            regressions.append(
+                f"{entry['module']} with {entry['paths']} paths: {entry['requests_per_s']} requests/s, was {before}"
+            )
+    return regressions
+
+
+def print_results(results):
+    print(f"{'paths':>6}  {'module':<24} {'requests':>9} {'wall s':>8} {'req/s':>9} {'RSS MB':>7} {'p99 gap ms':>10}")
+    for entry in results:
+        print(f"{entry['paths']:>6}  {entry['module']:<24} {entry['requests']:>9} {entry['wall_s']:>8} "
+              f"{entry['requests_per_s']:>9} {entry['peak_rss_mb']:>7} {str(entry['p99_client_gap_ms']):>10}")
+
+    print("\nScaling (requests/s by number of paths):")
+    sizes = sorted({entry["paths"] for entry in results})
+    for module in sorted({entry["module"] for entry in results}):
+        rates = {entry["paths"]: entry["requests_per_s"] for entry in results if entry["module"] == module}
+        print(f"  {module:<24} " + "  ".join(f"{size}: {rates.get(size, '-')}" for size in sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hAPI end-to-end throughput benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated numbers of paths (default: 10,100,1000,10000)")
+    parser.add_argument("--modules", help="Comma-separated modules to run (default: all)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency the mock server adds to every response")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--save", help="Save the results to this file, for use as a baseline")
+    parser.add_argument("--baseline", help="Fail if throughput dropped compared to the results saved in this file")
+    parser.add_argument("--tolerance", type=float, default=20, help="Allowed throughput drop compared to the baseline, in percent (default: 20)")
+    parser.add_argument("cli_args", nargs=argparse.REMAINDER, help="Extra arguments passed to cli.py (e.g. -- --concurrency 50)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modules = args.modules.split(",") if args.modules else available_modules()
+    extra_args = [arg for arg in args.cli_args if arg != "--"]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="hapi-bench-") as workdir:
+        for size in sizes:
+            spec_file = os.path.join(workdir, f"spec_{size}.json")
+            server, url = start_mock_server(size, args.latency_ms, spec_file)
+            try:
+                for module in modules:
+                    result = run_module(url, spec_file, module, extra_args, workdir)
+                    if result:
+                        results.append(dict(result, paths=size))
+                        if not args.json:
+                            print(f"  {size} paths, {module}: {result['requests_per_s']} requests/s", file=sys.stderr)
+            finally:
+                server.terminate()
+                server.wait()
+
+    output = {"sizes": sizes, "latency_ms": args.latency_ms, "cli_args": extra_args, "results": results}
+    if args.json:
+        print(json.dumps(output, indent=4))
+    else:
+        print_results(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(output, file, indent=4)
+
+    failed = len(results) != len(sizes) * len(modules)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare_with_baseline(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"FAIL: {regression}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cli import add_scan_arguments, check_scan_arguments, parse_cookies, parse_headers, parse_module_arguments
+from core.module_loader import ModuleRegistry
+
+DEFAULT_PARALLEL_TARGETS = 4
+
+def load_manifest(manifest_file):
+    """
+    Loads the list of targets from a YAML or JSON manifest. The manifest is either a list of targets or
+    a dictionary with a 'targets' list. Each target is a dictionary with:
+
+    url: Target API URL (required)
+    input: Path to the OpenAPI Spec file, relative to the manifest (required)
+    headers: Headers added to the global -H headers, as a dictionary or a 'Name: value; Name: value' string
+    cookies: Cookies added to the global -C cookies, as a dictionary or a 'name=value; name=value' string
+    modules: List of modules to run (default: all)
+    args: Module-specific arguments, as a list or a string (e.g. '--vt-workers 20')
+    """
+    _, file_extension = os.path.splitext(manifest_file)
+    with open(manifest_file, "r", encoding="utf-8") as file:
+        if file_extension.lower() in [".yml", ".yaml"]:
+            import yaml
+            manifest = yaml.safe_load(file)
+        else:
+            manifest = json.load(file)
+
+    targets = manifest.get("targets") if isinstance(manifest, dict) else manifest
+    if not isinstance(targets, list):
+        raise ValueError("The manifest must be a list of targets or contain a 'targets' list.")
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    for number, target in enumerate(targets, start=1):
+        if not isinstance(target, dict) or not target.get("url") or not target.get("input"):
+            raise ValueError(f"Target {number} of the manifest needs a 'url' and an 'input'.")
+        target["input"] = os.path.join(manifest_dir, target["input"])
+    return targets
+
+def target_arguments(args, target, available_modules):
+    """Builds the arguments of one target's scan from the global arguments and its manifest entry."""
+    headers = dict(args.headers)
+    headers.update(target.get("headers") if isinstance(target.get("headers"), dict) else parse_headers(target.get("headers")))
+    cookies = dict(args.cookies)
+    cookies.update(target.get("cookies") if isinstance(target.get("cookies"), dict) else parse_cookies(target.get("cookies")))
+
+    modules = target.get("modules") or ["all"]
+    unknown_modules = [module for module in modules if module not in available_modules and module != "all"]
+    if unknown_modules:
+        raise ValueError(f"Unknown modules: {', '.join(unknown_modules)}")
+
+    target_args = argparse.Namespace(**dict(
+        vars(args), url=target["url"].rstrip("/"), input=target["input"], headers=headers, cookies=cookies, modules=modules
+    ))
+
+    module_args = target.get("args") or []
+    if isinstance(module_args, str):
+        module_args = module_args.split()
+    selected_modules = available_modules.names() if "all" in modules else modules
+    return target_args, parse_module_arguments(available_modules, selected_modules, [str(arg) for arg in module_args])
+
+def main():
+    """Scans all targets of a manifest in one process, sharing the request limits and connection pools."""
+    parser = argparse.ArgumentParser(
+        description="hAPI batch mode - scan many OpenAPI-based REST APIs listed in a manifest",
+        allow_abbrev=False
+    )
+    parser.add_argument("manifest", help="YAML/JSON list of targets ({url, input, headers, cookies, modules, args})")
+    parser.add_argument("--parallel-targets", type=int, default=DEFAULT_PARALLEL_TARGETS, help=f"Number of targets scanned at once (default: {DEFAULT_PARALLEL_TARGETS})")
+    parser.add_argument("--summary", default="hAPI_batch_summary.json", help="File the summary of all scans is written to")
+    add_scan_arguments(parser)
+    args = parser.parse_args()
+
+    if args.resume or args.shards or args.shard_index is not None:
+        parser.error("--resume, --shards and --shard-index can't be used in batch mode")
+    if args.metrics_file or args.prometheus_file:
+        parser.error("--metrics-file and --prometheus-file can't be used in batch mode, the summary holds the metrics of each target")
+    check_scan_arguments(parser, args)
+
+    args.headers = parse_headers(args.headers)
+    args.cookies = parse_cookies(args.cookies)
+
+    try:
+        targets = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load the manifest '{args.manifest}': {e}")
+        sys.exit(1)
+
+    # Imported here, so the HTTP and parsing libraries are only loaded once the arguments are valid
+    from core.http_client import RequestLimiter
+    from core.scheduler import TrafficGate
+    from hapi import create_adapter, run_scan
+
+    # One limit on the requests in flight and one set of per-host connection pools for all targets
+    limiter = RequestLimiter(args.concurrency, args.host_connections)
+    adapter = create_adapter(args, limiter.per_host_limit)
+    # Exclusive modules (e.g. rate limiting) run while no other target sends traffic
+    gate = TrafficGate()
+    available_modules = ModuleRegistry()
+
+    def scan_target(target):
+        started_at = time.perf_counter()
+        summary = {"url": target["url"], "input": target["input"]}
+        try:
+            target_args, module_specific_args = target_arguments(args, target, available_modules)
+            summary.update(run_scan(target_args, module_specific_args, limiter=limiter, adapter=adapter, gate=gate))
+            summary["status"] = "completed"
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            # A failing target (e.g. an untrusted certificate exits its scan) doesn't stop the others
+            error = f"Exited with status {e.code}, see the output above" if isinstance(e, SystemExit) else str(e) or type(e).__name__
+            print(f"Error: Scan of '{target['url']}' failed: {error}")
+            summary["status"] = "failed"
+            summary["error"] = error
+        summary["duration"] = round(time.perf_counter() - started_at, 2)
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel_targets), thread_name_prefix="hapi-target") as executor:
+        summaries = list(executor.map(scan_target, targets))
+
+    failed = [summary for summary in summaries if summary["status"] == "failed"]
+    with open(args.summary, "w", encoding="utf-8") as file:
+        json.dump({"targets": summaries, "completed": len(summaries) - len(failed), "failed": len(failed)}, file, indent=4)
+    print(f"Scanned {len(summaries)} targets ({len(failed)} failed). Summary saved to {args.summary}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nInterrupted. Exiting...")
+        try:
+            sys.exit(130)
+        except SystemExit:
+            os._exit(130)
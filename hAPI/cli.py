@@ -1,8 +1,7 @@
 import argparse
 import sys
 import os
-from hapi import run_hapi
-from core.module_loader import load_modules
+from core.module_loader import ModuleRegistry
 
 def parse_headers(header_str):
     headers = {}
@@ -28,73 +27,151 @@ def parse_cookies(cookie_str):
             cookies[key.strip()] = value.strip()
     return cookies
 
-def show_help_for_modules(selected_modules, available_modules):
+def add_scan_arguments(parser):
+    """Adds the global arguments that aren't specific to a target, shared with the batch mode."""
+    parser.add_argument("-f", "--format", required=True, choices=["HTML", "JSON", "JSONL"], help="Report format (HTML, JSON, JSONL)")
+    parser.add_argument("--no-schema-cache", action="store_true", help="Don't use or write the parsed-schema cache (kept in the per-user cache directory)")
+    parser.add_argument("--stream-spec", action="store_true", help="Stream a JSON spec and keep only paths, verbs and response codes (for very large specs)")
+    parser.add_argument("-x", "--proxy", help="HTTP proxy (e.g. 'http://127.0.0.1:8080')")
+    parser.add_argument("-H", "--headers", help="Custom headers (e.g. 'User-Agent: test; X-Api-Key: testapikey')")
+    parser.add_argument("-C", "--cookies", help="Custom cookies (e.g. 'SessionID=test; AuthToken=xyz')")
+    parser.add_argument("--ignore-ssl", action="store_true", help="Ignore SSL certificate verification")
+    parser.add_argument("--timeout", type=float, help="Seconds to wait for a connection or a response before a request fails (default: 30)")
+    parser.add_argument("--connect-timeout", type=float, help="Seconds to wait for a connection, overrides --timeout")
+    parser.add_argument("--read-timeout", type=float, help="Seconds to wait for each read of a response, overrides --timeout")
+    parser.add_argument("--retries", type=int, help="Number of times a request that failed without a response is retried (default: 2)")
+    parser.add_argument("--retry-backoff", type=float, help="Base delay between retries in seconds, doubled on every retry and jittered (default: 0.5)")
+    parser.add_argument("--scan-deadline", type=float, metavar="SECONDS", help="Stop sending requests after this many seconds, the remaining probes are recorded as errors")
+    parser.add_argument("--circuit-failures", type=int, help="Stop probing an endpoint after this many consecutive failed requests, 0 to never stop (default: 5)")
+    parser.add_argument("--circuit-reset", type=float, help="Seconds before a stopped endpoint is tried again (default: 60)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum number of requests in flight at once (default: 10)")
+    parser.add_argument("--host-connections", type=int, help="Maximum number of concurrent connections per host (default: --concurrency)")
+    parser.add_argument("--pool-connections", type=int, help="Number of hosts whose connection pools are kept (default: 10)")
+    parser.add_argument("--pool-maxsize", type=int, help="Number of keep-alive connections kept per host (default: --host-connections)")
+    parser.add_argument("--pool-block", action="store_true", help="Never open more than --pool-maxsize connections to a host, wait for a free one")
+    parser.add_argument("--no-keep-alive", action="store_true", help="Open a new connection for every request")
+    parser.add_argument("--tcp-keepalive", type=int, metavar="SECONDS", help="Send TCP keep-alive probes on connections idle for this many seconds")
+    parser.add_argument("--max-body-bytes", type=int, default=65536, help="Bytes of a response body read for modules that only need status codes and headers (default: 65536)")
+    parser.add_argument("--full-bodies", action="store_true", help="Always read response bodies in full")
+    parser.add_argument("--http2", action="store_true", help="Send the requests over HTTP/2 with httpx (pip install 'httpx[http2]')")
+    parser.add_argument("--http2-connections", type=int, default=1, help="Number of HTTP/2 connections the requests are spread over (default: 1, all requests multiplexed)")
+    parser.add_argument("--adaptive-rate", action="store_true", help="Adapt concurrency and request rate to the target's feedback (429/503, Retry-After, latency)")
+    parser.add_argument("--max-rps", type=float, help="Never send more than this many requests per second")
+    parser.add_argument("--cache", action="store_true", help="Share responses to identical read-only requests between modules")
+    parser.add_argument("--cache-size", type=int, help="Maximum number of cached responses (default: 1024)")
+    parser.add_argument("--cache-ttl", type=int, help="Seconds a cached response stays valid (default: 300)")
+    parser.add_argument("--store", help="SQLite file that records every completed probe (default: hapi_scans.db in the per-user data directory)")
+    parser.add_argument("--no-store", action="store_true", help="Don't record the scan, it can't be resumed")
+    parser.add_argument("--resume", metavar="SCAN_ID", help="ID of an interrupted scan to resume, skipping the probes it already completed")
+    parser.add_argument("--incremental", action="store_true", help="Only test endpoints that are new or changed since the last scan of the target, carry the other results forward")
+    parser.add_argument("--full-every", type=int, metavar="N", help="With --incremental, run a full scan every N scans")
+    parser.add_argument("--shards", type=int, metavar="N", help="Split the scan into N shards, run in parallel processes unless --shard-index is given")
+    parser.add_argument("--shard-index", type=int, help="Only run this shard (0 to N-1) of a sharded scan, e.g. on one of N CI runners")
+    parser.add_argument("--metrics-file", help="Write per-request timing totals of the scan (per module) to this JSON file")
+    parser.add_argument("--prometheus-file", help="Write the scan metrics to this file in the Prometheus text format")
+    parser.add_argument("--group-findings", action="store_true", help="Collapse rows of endpoints that got the same response (status and security headers) into one row per finding (HTML, JSON)")
+    parser.add_argument("--fingerprint-body", action="store_true", help="With --group-findings, responses must also have the same body to be grouped")
+
+def check_scan_arguments(parser, args):
+    """Rejects combinations of the global arguments that can't work together."""
+    if args.http2 and (args.no_keep_alive or args.pool_block or args.pool_maxsize or args.tcp_keepalive):
+        parser.error("--http2 manages its own connections, use --http2-connections instead of the --pool-*, --no-keep-alive and --tcp-keepalive options")
+    if args.group_findings and args.format.upper() == "JSONL":
+        parser.error("--group-findings can't be used with JSONL reports, their rows are written as soon as they arrive")
+    if args.group_findings and args.shard_index is not None:
+        parser.error("--group-findings can't be used with --shard-index, the shard reports are merged row by row")
+    if args.fingerprint_body and not args.group_findings:
+        parser.error("--fingerprint-body only applies with --group-findings")
+    if args.shards and args.shards > 1 and args.shard_index is None:
+        # The request limits are split between the shard processes (see hapi._shard_args)
+        for option, value in (("--concurrency", args.concurrency), ("--host-connections", args.host_connections), ("--pool-maxsize", args.pool_maxsize)):
+            if value and value < args.shards:
+                parser.error(f"{option} {value} can't be split between {args.shards} shards, use at most {value} shards")
+
+def parse_module_arguments(available_modules, selected_modules, remaining_args):
+    """Parses the module-specific arguments of the selected modules. Returns a dictionary of module name -> Namespace."""
+    module_specific_args = {}
+    for module_name in selected_modules:
+        module_parser = argparse.ArgumentParser(add_help=False)
+        if module_name in available_modules:
+            available_modules.add_arguments(module_name, module_parser)
+            module_specific_args[module_name], _ = module_parser.parse_known_args(remaining_args)
+        else:
+            module_specific_args[module_name] = argparse.Namespace()  # Ensure module gets an empty Namespace
+    return module_specific_args
+
+def _format_options_help(parser):
+    """Returns the help of the parser's options, generated by argparse like the module-specific help below."""
+    formatter = parser._get_formatter()
+    formatter.start_section(None)
+    formatter.add_arguments([action for action in parser._actions if action.option_strings and action.dest != "help"])
+    formatter.end_section()
+    return formatter.format_help().rstrip("\n")
+
+def create_parser(available_modules):
+    """Creates the parser of the global arguments and the module selection."""
+    parser = argparse.ArgumentParser(
+        description="hAPI - A Security Testing Tool for OpenAPI-based REST APIs",
+        allow_abbrev=False
+    )
+
+    # Global arguments
+    parser.add_argument("-u", "--url", required=True, help="Target API URL")
+    parser.add_argument("-i", "--input", required=True, help="Path to OpenAPI Spec file (YAML/JSON)")
+    add_scan_arguments(parser)
+
+    # Add module selection (multiple choices allowed)
+    parser.add_argument(
+        "modules",
+        nargs="+",
+        choices=available_modules.names() + ["all"],
+        help="Security modules to run (e.g., 'verb_tampering rate_limiting')"
+    )
+    return parser
+
+def show_help_for_modules(parser, selected_modules, available_modules):
     """ Dynamically generate help for selected modules. """
     if "all" in selected_modules:
-        selected_modules = list(available_modules.keys())  # Expand "all" to include all modules
+        selected_modules = available_modules.names()  # Expand "all" to include all modules
 
     print("\n=== hAPI - A Security Testing Tool for OpenAPI-based REST APIs ===\n")
     print("Usage: python3 cli.py -u <URL> -i <SpecFile> -f <Format> <Modules> [Module Arguments]\n")
     print("Global Options:")
-    print("  -u, --url         Target API URL")
-    print("  -i, --input       Path to OpenAPI Spec file (YAML/JSON)")
-    print("  -f, --format      Report format (HTML, JSON)")
-    print("  -x, --proxy       HTTP proxy (e.g. 'http://127.0.0.1:8080')")
-    print("  -H, --headers     Custom headers (e.g. 'User-Agent: test; X-Api-Key: testapikey')")
-    print("  -C, --cookies     Custom cookies (e.g. 'SessionID=test; AuthToken=xyz')")
-    print("  --ignore-ssl      Ignore SSL certificate verification")
-    
+    print(_format_options_help(parser))
+
     print("\nAvailable Modules:")
-    for module in available_modules.keys():
+    for module in available_modules.names():
         print(f"  - {module}")
 
     print("\nModule-Specific Arguments:")
     for module_name in selected_modules:
         if module_name in available_modules:
-            module_class = available_modules[module_name]
             module_parser = argparse.ArgumentParser(prog=f"{module_name} module", add_help=False)
-            if hasattr(module_class, 'add_arguments'):
-                module_class.add_arguments(module_parser)
+            available_modules.add_arguments(module_name, module_parser)
             print(f"\n{module_name} Options:")
             module_parser.print_help()
 
     sys.exit(0)
 
 def main():
-    # Load available modules dynamically
-    available_modules = load_modules()
+    # List available modules without importing them, so that -h and argument parsing stay fast
+    available_modules = ModuleRegistry()
+
+    parser = create_parser(available_modules)
 
     # If "-h" or "--help" is provided, check for modules in the arguments
     if "-h" in sys.argv or "--help" in sys.argv:
         # Extract modules from command-line arguments (if any)
         modules_from_cli = [arg for arg in sys.argv[1:] if arg in available_modules or arg == "all"]
-        show_help_for_modules(modules_from_cli, available_modules)
-
-    parser = argparse.ArgumentParser(
-        description="hAPI - A Security Testing Tool for OpenAPI-based REST APIs",
-        allow_abbrev=False
-    )
-
-    # Global arguments
-    parser.add_argument("-u", "--url", required=True, help="Target API URL")
-    parser.add_argument("-i", "--input", required=True, help="Path to OpenAPI Spec file (YAML/JSON)")
-    parser.add_argument("-f", "--format", required=True, choices=["HTML", "JSON"], help="Report format")
-    parser.add_argument("-x", "--proxy", help="HTTP proxy (e.g. 'http://127.0.0.1:8080')")
-    parser.add_argument("-H", "--headers", help="Custom headers (e.g. 'User-Agent: test; X-Api-Key: testapikey')")
-    parser.add_argument("-C", "--cookies", help="Custom cookies (e.g. 'SessionID=test; AuthToken=xyz')")
-    parser.add_argument("--ignore-ssl", action="store_true", help="Ignore SSL certificate verification")
-
-    # Add module selection (multiple choices allowed)
-    parser.add_argument(
-        "modules",
-        nargs="+",
-        choices=list(available_modules.keys()) + ["all"],
-        help="Security modules to run (e.g., 'verb_tampering rate_limiting')"
-    )
+        show_help_for_modules(parser, modules_from_cli, available_modules)
 
     # Parse initial known args
     known_args, remaining_args = parser.parse_known_args()
 
+    if known_args.shard_index is not None and not (known_args.shards and 0 <= known_args.shard_index < known_args.shards):
+        parser.error("--shard-index must be between 0 and --shards minus 1")
+    check_scan_arguments(parser, known_args)
+
     # Normalize URL
     if known_args.url[-1] == "/":
         known_args.url = known_args.url[:-1]
@@ -104,17 +181,13 @@ def main():
     known_args.headers = parse_headers(known_args.headers)
 
     # Expand "all" to include all available modules
-    selected_modules = list(available_modules.keys()) if "all" in known_args.modules else known_args.modules
+    selected_modules = available_modules.names() if "all" in known_args.modules else known_args.modules
 
     # Dynamically parse module-specific arguments for all selected modules
-    module_specific_args = {}
-    for module_name in selected_modules:
-        module_parser = argparse.ArgumentParser(add_help=False)
-        if module_name in available_modules and hasattr(available_modules[module_name], 'add_arguments'):
-            available_modules[module_name].add_arguments(module_parser)
-            module_specific_args[module_name], _ = module_parser.parse_known_args(remaining_args)
-        else:
-            module_specific_args[module_name] = argparse.Namespace()  # Ensure module gets an empty Namespace
+    module_specific_args = parse_module_arguments(available_modules, selected_modules, remaining_args)
+
+    # Imported here, so the HTTP and parsing libraries are only loaded once the arguments are valid
+    from hapi import run_hapi
 
     # Pass arguments to main logic
     run_hapi(known_args, module_specific_args)
@@ -0,0 +1,67 @@
+import threading
+import time
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker. After failure_threshold consecutive failed requests to an endpoint, its
+    circuit opens and requests to it fail immediately instead of waiting for timeouts. After reset_timeout
+    seconds a single trial request is let through: if it succeeds the circuit closes, otherwise it stays open
+    for another reset_timeout.
+    """
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RESET_TIMEOUT = 60.0  # seconds
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        """
+        :param failure_threshold: Consecutive failures that open the circuit of an endpoint (default: 5).
+        :param reset_timeout: Seconds an open circuit waits before letting a trial request through (default: 60).
+        """
+        self.failure_threshold = max(1, failure_threshold or self.DEFAULT_FAILURE_THRESHOLD)
+        self.reset_timeout = reset_timeout if reset_timeout is not None else self.DEFAULT_RESET_TIMEOUT
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+        self._trials = {}  # Endpoint -> thread sending its trial request
+
+    def allow(self, endpoint):
+        """Returns True if a request to the endpoint may be sent. Claims the trial request of an open circuit."""
+        with self._lock:
+            opened_at = self._opened_at.get(endpoint)
+            if opened_at is None:
+                return True
+            if endpoint in self._trials or time.monotonic() - opened_at < self.reset_timeout:
+                return False
+            self._trials[endpoint] = threading.get_ident()
+            return True
+
+    def release(self, endpoint):
+        """
+        Gives up the trial request the current thread claimed for the endpoint, if it ends without a success or
+        failure being recorded (e.g. the scan deadline passed). The next request to the endpoint becomes the trial.
+        """
+        with self._lock:
+            if self._trials.get(endpoint) == threading.get_ident():
+                del self._trials[endpoint]
+
+    def record_success(self, endpoint):
+        """Closes the endpoint's circuit and resets its failure count."""
+        with self._lock:
+            self._failures.pop(endpoint, None)
+            self._opened_at.pop(endpoint, None)
+            self._trials.pop(endpoint, None)
+
+    def record_failure(self, endpoint):
+        """Counts a failed request. Returns True if this failure opened (or reopened) the endpoint's circuit."""
+        with self._lock:
+            self._failures[endpoint] = self._failures.get(endpoint, 0) + 1
+            if endpoint in self._trials or (endpoint not in self._opened_at and self._failures[endpoint] >= self.failure_threshold):
+                self._trials.pop(endpoint, None)
+                self._opened_at[endpoint] = time.monotonic()
+                return True
+            return False
+
+    def open_endpoints(self):
+        """Returns the endpoints whose circuit is currently open."""
+        with self._lock:
+            return sorted(self._opened_at)
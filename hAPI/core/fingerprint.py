@@ -0,0 +1,119 @@
+import hashlib
+import threading
+
+# Headers that decide the verdict of a security check. Others (Date, ETag, request IDs, ...) differ between
+# otherwise identical responses and are left out of fingerprints
+SECURITY_HEADERS = (
+    "access-control-allow-origin", "access-control-allow-credentials", "access-control-allow-methods",
+    "access-control-allow-headers", "access-control-expose-headers", "allow", "www-authenticate",
+    "strict-transport-security", "x-content-type-options", "x-frame-options", "content-security-policy",
+    "referrer-policy", "permissions-policy", "cross-origin-resource-policy", "server", "x-powered-by",
+    "content-type", "cache-control",
+)
+
+# Headers whose value is a list in which the order doesn't matter
+LIST_HEADERS = {"access-control-allow-methods", "access-control-allow-headers", "access-control-expose-headers", "allow"}
+
+
+def response_fingerprint(response, include_body=False):
+    """
+    Returns a short hash of the status code and the security-relevant headers of a response.
+
+    :param response: A requests.Response or any object with status_code and headers (e.g. a RawResponse).
+    :param include_body: Also hash the body. Bodies of modules that only need headers are cut off at
+                         --max-body-bytes, the hash then covers the part that was read. Responses
+                         without a body (e.g. from the raw prober) are hashed without it.
+    """
+    headers = {str(name).lower(): str(value) for name, value in response.headers.items()}
+    parts = [str(response.status_code)]
+    for name in SECURITY_HEADERS:
+        if name in headers:
+            parts.append(f"{name}: {_normalize(name, headers[name])}")
+    if include_body and getattr(response, "content", None) is not None:
+        parts.append(hashlib.sha256(response.content).hexdigest())
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(name, value):
+    if name in LIST_HEADERS:
+        return ", ".join(sorted(item.strip().lower() for item in value.split(",") if item.strip()))
+    return " ".join(value.split())
+
+
+class ResponseFingerprints:
+    """
+    Fingerprints of the responses a module received, by probe. Modules record each response under the key
+    its result rows are identified by (see FindingClusterer), from any thread.
+    """
+
+    def __init__(self, include_body=False):
+        """
+        :param include_body: Include the hash of the body in the fingerprints.
+        """
+        self.include_body = include_body
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, response):
+        fingerprint = response_fingerprint(response, self.include_body)
+        with self._lock:
+            self._fingerprints[key] = fingerprint
+
+    def get(self, key):
+        """Returns the fingerprint of the probe, or None if it wasn't sent in this run (e.g. resumed from the store)."""
+        with self._lock:
+            return self._fingerprints.get(key)
+
+
+class NullFingerprints:
+    """Used when findings aren't grouped: nothing is recorded."""
+
+    def record(self, key, response):
+        pass
+
+    def get(self, key):
+        return None
+
+
+class FindingClusterer:
+    """
+    Collapses result rows that only differ in their endpoint and whose responses share a fingerprint into
+    one row, whose endpoint cell lists all affected endpoints. Groups keep the position of their first row.
+
+    Rows without a fingerprint (probes resumed from the store, or modules that don't record any) are only
+    grouped with other rows without one.
+    """
+
+    ENDPOINT_SEPARATOR = ", "
+
+    def __init__(self, endpoint_column=0):
+        """
+        :param endpoint_column: Index of the column holding the endpoint (or path) of a row.
+        """
+        self.endpoint_column = endpoint_column
+        self._groups = {}  # (fingerprint, other cells) -> (first row, endpoints)
+
+    def add(self, row, fingerprint=None):
+        other_cells = tuple(str(cell) for index, cell in enumerate(row) if index != self.endpoint_column)
+        group = self._groups.setdefault((fingerprint, other_cells), (row, []))
+        group[1].append(str(row[self.endpoint_column]))
+
+    def rows(self):
+        grouped = []
+        for row, endpoints in self._groups.values():
+            row = list(row)
+            row[self.endpoint_column] = self.ENDPOINT_SEPARATOR.join(dict.fromkeys(endpoints))
+            grouped.append(row)
+        return grouped
+
+    @classmethod
+    def group(cls, rows, fingerprint_of=None, endpoint_column=0):
+        """
+        Returns the grouped rows.
+
+        :param fingerprint_of: Callable returning the fingerprint of a row, or None.
+        """
+        clusterer = cls(endpoint_column)
+        for row in rows:
+            clusterer.add(row, fingerprint_of(row) if fingerprint_of else None)
+        return clusterer.rows()
@@ -0,0 +1,104 @@
+import io
+import itertools
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers that are only meaningful for a single HTTP/1.1 connection and are not allowed in HTTP/2
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"}
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Transport adapter that sends the requests of a requests.Session over HTTP/2 with httpx, so that the
+    session's headers, cookies, auth and the rest of HTTPClient work unchanged.
+
+    Each connection is an httpx client limited to a single connection, which carries all of its requests as
+    concurrent HTTP/2 streams. Requests to a host are spread round-robin over its connections.
+    HTTP/2 is negotiated during the TLS handshake; targets that don't support it (and plain http:// URLs)
+    are served over HTTP/1.1, one request at a time per connection.
+    """
+
+    def __init__(self, connections=1, verify_ssl=True, proxy=None):
+        """
+        :param connections: Number of connections to open per host. 1 multiplexes every request to a host over
+                            a single connection.
+        :param verify_ssl: Boolean to enable/disable SSL verification.
+        :param proxy: Optional proxy URL.
+        """
+        super().__init__()
+        try:
+            import h2  # noqa: F401 (httpx needs it for http2=True)
+            import httpx
+        except ImportError:
+            raise ImportError("HTTP/2 requires the 'httpx' and 'h2' packages (pip install 'httpx[http2]').") from None
+        self._httpx = httpx
+        self.connections = max(1, connections)
+        self.verify_ssl = verify_ssl
+        self.proxy = proxy
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _client(self, url):
+        """Returns the next client of the URL's host, creating the host's clients on first use."""
+        host = urlsplit(url)[:2]
+        with self._hosts_lock:
+            if host not in self._hosts:
+                limits = self._httpx.Limits(max_connections=1, max_keepalive_connections=1)
+                clients = [
+                    self._httpx.Client(http2=True, verify=self.verify_ssl, proxy=self.proxy, limits=limits)
+                    for _ in range(self.connections)
+                ]
+                self._hosts[host] = (clients, itertools.count())
+            clients, counter = self._hosts[host]
+            return clients[next(counter) % len(clients)]
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """Sends a PreparedRequest and returns a requests.Response. Verification and proxy are set per adapter."""
+        httpx = self._httpx
+        client = self._client(request.url)
+        headers = [(name, value) for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS]
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        try:
+            reply = client.request(request.method, request.url, headers=headers, content=request.body, timeout=timeout)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.ProxyError as e:
+            raise requests.exceptions.ProxyError(e, request=request)
+        except httpx.ConnectError as e:
+            if "CERTIFICATE_VERIFY_FAILED" in str(e):
+                raise requests.exceptions.SSLError(e, request=request)
+            raise requests.exceptions.ConnectionError(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        return self.build_response(request, reply)
+
+    def build_response(self, request, reply):
+        """Builds a requests.Response from an httpx response. The body is already decoded."""
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = CaseInsensitiveDict(reply.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(reply.content)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        for cookie in reply.cookies.jar:
+            response.cookies.set_cookie(cookie)
+        return response
+
+    def close(self):
+        with self._hosts_lock:
+            for clients, _ in self._hosts.values():
+                for client in clients:
+                    client.close()
+            self._hosts.clear()
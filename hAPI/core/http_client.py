@@ -1,10 +1,113 @@
+import asyncio
+import copy
+import functools
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from exceptions import CircuitOpenError, RequestFailedError, ScanDeadlineError
+
+# Connection phases of the request being sent by the current thread, filled in by the instrumented connections
+_connection_phases = threading.local()
+
+
+class InstrumentedHTTPConnection(HTTPConnection):
+    """Records the time spent opening the connection, for HTTPClient's request hooks."""
+
+    def _new_conn(self):
+        started_at = time.perf_counter()
+        sock = super()._new_conn()
+        _connection_phases.connect_ms = (time.perf_counter() - started_at) * 1000
+        return sock
+
+    def connect(self):
+        started_at = time.perf_counter()
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            _connection_phases.tls_ms = (time.perf_counter() - started_at) * 1000 - _connection_phases.connect_ms
+
+
+class InstrumentedHTTPSConnection(InstrumentedHTTPConnection, HTTPSConnection):
+    """HTTPS version of InstrumentedHTTPConnection. Everything after the TCP connect is the TLS handshake."""
+
+
+class InstrumentedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = InstrumentedHTTPConnection
+
+
+class InstrumentedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = InstrumentedHTTPSConnection
+
+
+class InstrumentedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose direct connections record their connect and TLS handshake times."""
+
+    POOL_CLASSES = {"http": InstrumentedHTTPConnectionPool, "https": InstrumentedHTTPSConnectionPool}
+
+    # Number of hosts whose connection pools are kept, like HTTPAdapter's default
+    DEFAULT_POOL_CONNECTIONS = 10
+
+    def __init__(self, *args, socket_options=None, **kwargs):
+        """
+        Accepts the same arguments as HTTPAdapter (pool_connections, pool_maxsize, pool_block, ...), plus:
+
+        :param socket_options: Socket options of new connections, replacing urllib3's defaults (see tcp_keepalive_options).
+        """
+        self.socket_options = socket_options
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if getattr(self, "socket_options", None):
+            kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.POOL_CLASSES
+
+
+def tcp_keepalive_options(idle_seconds):
+    """
+    Returns socket options that enable TCP keep-alive probes after idle_seconds without traffic, so that pooled
+    connections aren't silently dropped by NATs and load balancers while a module is busy elsewhere.
+    """
+    options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle_seconds))
+    elif hasattr(socket, "TCP_KEEPALIVE"):  # macOS
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle_seconds))
+    return options
+
 
 class HTTPClient:
     """Handles HTTP requests with optional custom headers, cookies, proxies, and SSL settings."""
 
-    def __init__(self, base_url, headers=None, cookies=None, proxies=None, verify_ssl=True):
+    # Only requests without side effects are ever served from the cache
+    CACHEABLE_VERBS = {"GET", "HEAD", "OPTIONS"}
+
+    # Seconds to wait for the connection and for each read of the response, unless a request sets its own
+    DEFAULT_TIMEOUT = 30
+
+    # Failures without a response that are worth retrying, the next attempt may get through
+    RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)
+
+    # Verbs whose requests have the same effect when sent twice (RFC 9110, section 9.2.2), the only ones retried
+    # after a failure that may have happened once the server got the request
+    IDEMPOTENT_VERBS = {"GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE", "QUERY", "PROPFIND", "SEARCH"}
+    DEFAULT_RETRIES = 2
+    DEFAULT_RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+    MAX_RETRY_DELAY = 10.0  # seconds
+
+    # Bytes read at a time from bodies that are read up to a limit
+    BODY_CHUNK_SIZE = 16384
+
+    def __init__(self, base_url, headers=None, cookies=None, proxies=None, verify_ssl=True, cache=None,
+                 timeout=None, keep_alive=True, retries=None, retry_backoff=None, deadline=None, circuit_breaker=None,
+                 header_only_body_bytes=None):
         """
         Initializes the HTTP client.
 
@@ -13,35 +116,444 @@ class HTTPClient:
         :param cookies: Dictionary of default cookies.
         :param proxies: Dictionary of proxies (e.g., {"http": "http://127.0.0.1:8080", "https": "http://127.0.0.1:8080"}).
         :param verify_ssl: Boolean to enable/disable SSL verification (default: True).
+        :param cache: Optional ResponseCache shared by requests sent with use_cache=True.
+        :param timeout: Default timeout of the requests in seconds, or a (connect, read) tuple (default: DEFAULT_TIMEOUT).
+        :param keep_alive: Reuse connections between requests. If False, every request opens a new connection.
+        :param retries: Number of times a request that failed without a response is retried (default: DEFAULT_RETRIES).
+        :param retry_backoff: Base delay between retries in seconds. The delay doubles with every retry and is jittered.
+        :param deadline: time.monotonic() value after which no request is sent anymore, None for no deadline.
+        :param circuit_breaker: Optional CircuitBreaker that stops requests to endpoints that keep failing.
+        :param header_only_body_bytes: Bytes of a response body read for modules that only look at status codes and
+                                       headers (see for_module). None reads every body in full.
         """
         self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.retries = max(0, retries if retries is not None else self.DEFAULT_RETRIES)
+        self.retry_backoff = retry_backoff if retry_backoff is not None else self.DEFAULT_RETRY_BACKOFF
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker
+        self.header_only_body_bytes = header_only_body_bytes
+        self.max_body_bytes = None  # Set on the views of modules that don't need bodies
+        self.failed_endpoints = {}  # Endpoint -> reason of its last failed request, shared with the module views
+        self._deadline_state = {"reported": False}
+        self._failures_lock = threading.Lock()
+        self.module = None
+        self.request_hooks = []
+        self._pending = threading.local()
         self.session = requests.Session()
         self.session.headers.update(headers or {})
         self.session.cookies.update(cookies or {})
         self.session.proxies.update(proxies or {})  # Proxy support
         self.session.verify = verify_ssl  # Can be set to False for private APIs with self-signed certs
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        adapter = InstrumentedHTTPAdapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
         # Suppress SSL warnings if verification is disabled
         if not verify_ssl:
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    def send_request(self, path, verb, **kwargs):
+    def send_request(self, path, verb, use_cache=False, bypass_throttle=False, **kwargs):
         """
         Send an HTTP request.
 
         :param path: API path to append to the base URL.
         :param verb: HTTP method/verb (e.g., GET, POST, etc.).
+        :param use_cache: Allow the response to be served from (and stored in) the response cache.
+                          Only has an effect if the client was created with a cache.
+        :param bypass_throttle: Send the request without waiting for the adaptive rate controller or, in
+                                AsyncHTTPClient, for a free request slot. Meant for modules that measure the
+                                target's own rate limiting and bound their load themselves.
         :param kwargs: Optional request parameters (headers, json, data, etc.).
-        :return: Response object or None if request fails.
+        :return: Response object.
+        :raises RequestFailedError: If the request failed without a response after all retries, its endpoint's
+                                    circuit is open (CircuitOpenError) or the scan deadline passed (ScanDeadlineError).
+        """
+        if use_cache and self.cache is not None and self._is_cacheable(verb, kwargs):
+            # Responses with a cut-off body are only shared between clients that read bodies up to the same limit
+            key = (self.max_body_bytes, self.cache.make_key(
+                verb, f"{self.base_url}{path}", kwargs.get("headers"), kwargs.get("auth"), kwargs.get("params")
+            ))
+            return self.cache.get_or_fetch(key, lambda: self._send_with_retries(path, verb, bypass_throttle, **kwargs))
+        return self._send_with_retries(path, verb, bypass_throttle, **kwargs)
+
+    def _send_with_retries(self, path, verb, bypass_throttle=False, **kwargs):
+        """
+        Sends the request, retrying failures without a response with jittered exponential backoff (see _is_retryable).
+        Every attempt waits for the limits again, so a request that backs off doesn't hold a request slot. Exits on
+        untrusted certificates, which no retry can fix.
         """
+        endpoint = path.split("?", 1)[0]
+        if self.circuit_breaker and not self.circuit_breaker.allow(endpoint):
+            raise CircuitOpenError(f"Not sent, earlier requests failed repeatedly ({self.failed_endpoints.get(endpoint, 'unknown error')})")
         try:
-            try:
-                final_url = f"{self.base_url}{path}"
-                response = self.session.request(verb.upper(), final_url, **kwargs)
+            for attempt in range(self.retries + 1):
+                self._check_deadline()
+                try:
+                    response = self._send(path, verb, bypass_throttle, **kwargs)
+                except requests.exceptions.SSLError as e:
+                    print(f"Untrusted certificate error:\n{e}.\n\nTo disable certificate verification, use --ignore-ssl. This will expose your traffic to man-in-the-middle attacks. Exiting.")
+                    raise SystemExit(1)
+                except requests.RequestException as e:
+                    # A request cut short by the deadline didn't fail because of the endpoint
+                    self._check_deadline()
+                    if self._is_retryable(e, verb) and attempt < self.retries:
+                        time.sleep(random.uniform(0, min(self.MAX_RETRY_DELAY, self.retry_backoff * 2 ** attempt)))
+                        continue
+                    reason = self._describe_failure(e)
+                    self._record_failure(endpoint, reason)
+                    raise RequestFailedError(f"{reason} after {attempt + 1} attempt{'s' if attempt else ''}") from e
+
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_success(endpoint)
                 return response
-            except requests.exceptions.SSLError as e:
-                print(f"Untrusted certificate error:\n{e}.\n\nTo disable certificate verification, use --ignore-ssl. This will expose your traffic to man-in-the-middle attacks. Exiting.")
-                raise SystemExit(1)
-        except requests.RequestException as e:
-            print(f"Error sending request: {e}. Exiting.")
-            raise SystemExit(1)
+        finally:
+            if self.circuit_breaker:
+                self.circuit_breaker.release(endpoint)  # In case this was a trial request that ended without an outcome
+
+    def _is_retryable(self, error, verb):
+        """
+        Returns True if the failed request may be sent again. Read timeouts and bodies cut off mid-response mean
+        the server may have acted on the request, so those are only retried for idempotent verbs.
+        """
+        if not isinstance(error, self.RETRYABLE_ERRORS):
+            return False
+        reached_server = (isinstance(error, requests.exceptions.ChunkedEncodingError)
+                          or (isinstance(error, requests.exceptions.Timeout)
+                              and not isinstance(error, requests.exceptions.ConnectTimeout)))
+        return not reached_server or verb.upper() in self.IDEMPOTENT_VERBS
+
+    @staticmethod
+    def _describe_failure(error):
+        """Returns a short description of a request exception, for the report."""
+        if isinstance(error, requests.exceptions.Timeout):
+            return "Timed out"
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return "Connection failed"
+        return type(error).__name__
+
+    def _record_failure(self, endpoint, reason):
+        """Remembers the failed endpoint and reports it to the circuit breaker."""
+        self.failed_endpoints[endpoint] = reason
+        if self.circuit_breaker and self.circuit_breaker.record_failure(endpoint):
+            print(f"Warning: Requests to '{endpoint}' failed {self.circuit_breaker.failure_threshold} times in a row "
+                  f"({reason}). Skipping it for {self.circuit_breaker.reset_timeout:g} s.")
+
+    def _check_deadline(self):
+        """Raises ScanDeadlineError once the deadline has passed. Warns the first time."""
+        if not self.deadline_passed():
+            return
+        with self._failures_lock:
+            if not self._deadline_state["reported"]:
+                self._deadline_state["reported"] = True
+                print("Warning: The scan deadline passed. The remaining probes are recorded as errors.")
+        raise ScanDeadlineError("Not sent, the scan deadline passed")
+
+    def deadline_passed(self):
+        """Returns True if the client has a deadline and it has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _request_timeout(self):
+        """Returns the timeout of the next request, shortened so that it ends by the deadline."""
+        if self.deadline is None:
+            return self.timeout
+        remaining = max(0.001, self.deadline - time.monotonic())
+        if isinstance(self.timeout, tuple):
+            return tuple(min(value, remaining) for value in self.timeout)
+        return min(self.timeout, remaining)
+
+    def add_request_hook(self, hook):
+        """
+        Registers a callable that is called after every request sent over the network (not for cached
+        responses) with a dictionary describing the request:
+
+        module: Name of the module that sent it (see for_module), or None
+        verb, path, status_code: The request and the response's status code (None if it failed)
+        error: The exception's message if the request failed, otherwise None
+        new_connection: True if a new connection was opened for the request, False if a pooled one was reused
+        connect_ms, tls_ms: Time spent on the TCP connect and the TLS handshake, 0 for reused connections
+        wait_ms: Time the request waited for the rate controller and a free slot before it was sent
+        ttfb_ms: Time from sending the request until the response headers arrived, including connect_ms and tls_ms
+        download_ms: Time spent reading the response body
+        bytes: Size of the response body as received
+        """
+        self.request_hooks.append(hook)
+
+    def for_module(self, module, needs_body=True):
+        """
+        Returns a view of the client for a single module. It shares the session, connections, cache and
+        limits of this client, but requests sent through it are reported to the hooks with the module's name.
+
+        :param needs_body: False if the module only looks at status codes and headers. Its responses are then
+                           streamed and their bodies read up to header_only_body_bytes only.
+        """
+        view = copy.copy(self)
+        view.module = module
+        view.max_body_bytes = None if needs_body else self.header_only_body_bytes
+        return view
+
+    def _is_cacheable(self, verb, kwargs):
+        """A request is cacheable if it has no side effects and no body."""
+        return verb.upper() in self.CACHEABLE_VERBS and not any(kwargs.get(k) for k in ("data", "json", "files"))
+
+    def _send(self, path, verb, bypass_throttle=False, **kwargs):
+        """Sends the request over the session. This client has no throttling, so bypass_throttle is ignored."""
+        if not self.request_hooks and self.max_body_bytes is None:
+            return self._request(path, verb, **kwargs)
+
+        queued_at = getattr(self._pending, "queued_at", None)
+        self._pending.queued_at = None
+        _connection_phases.connect_ms = None
+        _connection_phases.tls_ms = 0
+        timing = {"module": self.module, "verb": verb.upper(), "path": path, "status_code": None, "error": None}
+
+        started_at = time.perf_counter()
+        try:
+            # Stream, so that the time to the first byte and the body download can be told apart and the body can be cut off
+            response = self._request(path, verb, **dict(kwargs, stream=True))
+            headers_at = time.perf_counter()
+            self._read_body(response)
+            timing["status_code"] = response.status_code
+            timing["bytes"] = max(_bytes_received(response), len(response.content))
+            timing["ttfb_ms"] = (headers_at - started_at) * 1000
+            timing["download_ms"] = (time.perf_counter() - headers_at) * 1000
+            return response
+        except BaseException as e:
+            timing["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            timing["new_connection"] = _connection_phases.connect_ms is not None
+            timing["connect_ms"] = _connection_phases.connect_ms or 0
+            timing["tls_ms"] = _connection_phases.tls_ms
+            timing["wait_ms"] = (started_at - queued_at) * 1000 if queued_at is not None else 0
+            timing.setdefault("ttfb_ms", (time.perf_counter() - started_at) * 1000)
+            timing.setdefault("download_ms", 0)
+            timing.setdefault("bytes", 0)
+            for hook in self.request_hooks:
+                hook(timing)
+
+    def _read_body(self, response):
+        """
+        Reads the body of a streamed response. With max_body_bytes, a larger body is cut off and its connection is
+        closed rather than drained, as a new connection costs less than downloading the rest. Smaller bodies are
+        read in full, so their connection goes back to the pool. response.body_truncated tells which happened.
+        """
+        limit = self.max_body_bytes
+        response.body_truncated = False
+        if limit is None:
+            return response.content
+
+        chunks = []
+        content_length = response.headers.get("Content-Length", "")
+        has_body = response.request.method != "HEAD" and response.status_code not in (204, 304)
+        if has_body and content_length.isdigit() and int(content_length) > limit:
+            response.body_truncated = True
+        else:
+            read_bytes = 0
+            for chunk in response.iter_content(min(self.BODY_CHUNK_SIZE, limit + 1)):
+                chunks.append(chunk)
+                # tell() counts the bytes received (before decompression), but not for chunked bodies
+                read_bytes = max(read_bytes + len(chunk), _bytes_received(response))
+                if read_bytes > limit:
+                    response.body_truncated = True
+                    break
+
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+        if response.body_truncated:
+            response.raw.close()
+            # Hand the closed connection back, the pool replaces it on its next use
+            if hasattr(response.raw, "release_conn"):
+                response.raw.release_conn()
+        return response.content
+
+    def _request(self, path, verb, **kwargs):
+        """Sends a single attempt of the request over the session."""
+        final_url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self._request_timeout())
+        return self.session.request(verb.upper(), final_url, **kwargs)
+
+    def warm_connections(self, count, path=""):
+        """
+        Opens up to count keep-alive connections to the target without sending any request, so that
+        timing-sensitive checks don't pay for TCP and TLS handshakes. Best effort: failures are ignored.
+
+        :param count: Number of connections to open. The pool keeps at most its maxsize of them.
+        :param path: API path used to select the connection pool.
+        """
+        if self.session.proxies:
+            return  # Connections would go to the proxy, not the target
+
+        url = f"{self.base_url}{path}"
+        adapter = self.session.get_adapter(url)
+        if not isinstance(adapter, HTTPAdapter):
+            return  # The HTTP/2 adapter opens its connections with the first requests
+        try:
+            if hasattr(adapter, "get_connection_with_tls_context"):
+                request = requests.Request("GET", url).prepare()
+                pool = adapter.get_connection_with_tls_context(request, self.session.verify)
+            else:
+                pool = adapter.get_connection(url)
+                adapter.cert_verify(pool, url, self.session.verify, None)
+
+        except Exception as e:
+            print(f"Warning: Could not pre-open connections to '{url}': {e}")
+            return
+
+        # Connections beyond the pool's maxsize would be discarded (or, with --pool-block, wait forever)
+        count = min(count, pool.pool.maxsize) if pool.pool is not None else 0
+        connections = []
+        try:
+            for _ in range(count):
+                # Don't wait for connections other threads are using
+                connections.append(pool._get_conn(timeout=0))
+            for connection in connections:
+                if connection.sock is None:
+                    connection.connect()
+        except urllib3.exceptions.EmptyPoolError:
+            pass
+        except Exception as e:
+            print(f"Warning: Could not pre-open connections to '{url}': {e}")
+        finally:
+            for connection in connections:
+                pool._put_conn(connection)
+
+    def send_requests(self, batch):
+        """
+        Send a batch of HTTP requests one after another.
+
+        :param batch: Iterable of (path, verb) or (path, verb, kwargs) tuples.
+        :return: List of response objects in the same order as the batch.
+        """
+        return [self.send_request(path, verb, **kwargs) for path, verb, kwargs in _normalize_batch(batch)]
+
+
+class RequestLimiter:
+    """Bounds the number of in-flight requests globally and per host. Can be shared between clients."""
+
+    DEFAULT_CONCURRENCY = 10
+
+    def __init__(self, concurrency=None, per_host_limit=None):
+        """
+        :param concurrency: Maximum number of requests in flight at once across all hosts.
+        :param per_host_limit: Maximum number of requests in flight to a single host (default: concurrency).
+        """
+        self.concurrency = max(1, concurrency or self.DEFAULT_CONCURRENCY)
+        self.per_host_limit = max(1, min(per_host_limit or self.concurrency, self.concurrency))
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="hapi-http")
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+    def host_slot(self, host):
+        """Returns the semaphore guarding connections to the given host."""
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def acquire(self, host):
+        """Blocks until both a global and a per-host slot are free."""
+        self._slots.acquire()
+        self.host_slot(host).acquire()
+
+    def release(self, host):
+        """Frees the slots taken by acquire()."""
+        self.host_slot(host).release()
+        self._slots.release()
+
+
+class AsyncHTTPClient(HTTPClient):
+    """HTTP client that lets modules submit many requests at once, with bounded global and per-host concurrency."""
+
+    def __init__(self, base_url, concurrency=None, per_host_limit=None, limiter=None, adapter=None, rate_controller=None,
+                 **kwargs):
+        """
+        Initializes the asynchronous HTTP client.
+
+        Accepts the same arguments as HTTPClient, plus:
+
+        :param concurrency: Maximum number of requests in flight at once (default: 10).
+        :param per_host_limit: Maximum number of connections to a single host (default: concurrency).
+        :param limiter: A RequestLimiter shared with other clients. Overrides concurrency and per_host_limit.
+        :param adapter: A transport adapter (InstrumentedHTTPAdapter or HTTP2Adapter) holding the connections to the
+                        target. Can be shared with other clients, so that they share per-host connection pools.
+        :param rate_controller: Optional AdaptiveRateController that paces requests based on the target's feedback.
+        """
+        super().__init__(base_url, **kwargs)
+        self.limiter = limiter or RequestLimiter(concurrency, per_host_limit)
+        self.concurrency = self.limiter.concurrency
+        self.rate_controller = rate_controller
+
+        # Keep one pooled keep-alive connection per concurrent request slot
+        adapter = adapter or InstrumentedHTTPAdapter(pool_maxsize=self.limiter.per_host_limit)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _send(self, path, verb, bypass_throttle=False, **kwargs):
+        """
+        Sends the request once the rate controller allows it and a global and a per-host slot are free. Requests
+        sent with bypass_throttle wait for neither.
+
+        Synchronous callers of send_request share the same limits as the asynchronous ones.
+        """
+        self._pending.queued_at = time.perf_counter()
+        if bypass_throttle:
+            return super()._send(path, verb, **kwargs)
+        if self.rate_controller is None:
+            return self._send_limited(path, verb, **kwargs)
+
+        started_at = self.rate_controller.acquire()
+        response = None
+        try:
+            response = self._send_limited(path, verb, **kwargs)
+            return response
+        finally:
+            self.rate_controller.release(started_at, response)
+
+    def _send_limited(self, path, verb, **kwargs):
+        host = urlsplit(f"{self.base_url}{path}").netloc
+        self.limiter.acquire(host)
+        try:
+            return super()._send(path, verb, **kwargs)
+        finally:
+            self.limiter.release(host)
+
+    async def send_request_async(self, path, verb, **kwargs):
+        """Awaitable version of send_request."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.limiter.executor, functools.partial(self.send_request, path, verb, **kwargs)
+        )
+
+    async def gather_requests(self, batch):
+        """Sends all requests in the batch concurrently and returns the responses in batch order."""
+        return await asyncio.gather(
+            *(self.send_request_async(path, verb, **kwargs) for path, verb, kwargs in _normalize_batch(batch))
+        )
+
+    def send_requests(self, batch):
+        """
+        Send a batch of HTTP requests concurrently.
+
+        :param batch: Iterable of (path, verb) or (path, verb, kwargs) tuples.
+        :return: List of response objects in the same order as the batch.
+        """
+        return asyncio.run(self.gather_requests(batch))
+
+
+def _bytes_received(response):
+    """Returns the number of body bytes read from the connection so far, as far as the raw response tracks it."""
+    return response.raw.tell() if hasattr(response.raw, "tell") else 0
+
+
+def _normalize_batch(batch):
+    """Yields (path, verb, kwargs) tuples from (path, verb) or (path, verb, kwargs) entries."""
+    for entry in batch:
+        if len(entry) == 2:
+            yield entry[0], entry[1], {}
+        else:
+            yield entry[0], entry[1], entry[2] or {}
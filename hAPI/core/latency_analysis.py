@@ -0,0 +1,80 @@
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+ROLLING_WINDOW_FRACTION = 0.05  # Rolling median window as a share of the series length...
+MIN_ROLLING_WINDOW = 5
+MAX_ROLLING_WINDOW = 101  # ...bounded so the window stays cheap on very long series
+
+
+def analyze_latencies(latencies_ms):
+    """
+    Analyzes a per-request latency series in bulk.
+
+    :param latencies_ms: Sequence of response times in milliseconds, in request order.
+    :return: Dictionary with the percentiles, the rolling median at the start and end of the series and the
+             detected change point (onset_index is 1-based, None if the series is too short).
+    """
+    series = np.asarray(latencies_ms, dtype=float)
+    if series.size == 0:
+        return {"percentiles": {}, "rolling_median": (None, None), "onset_index": None,
+                "confidence": 0.0, "before_median": None, "after_median": None}
+
+    percentiles = dict(zip(PERCENTILES, np.round(np.percentile(series, PERCENTILES), 4).tolist()))
+    rolling = rolling_median(series)
+    onset, confidence = detect_change_point(series)
+
+    if onset is None:
+        before_median = after_median = None
+    else:
+        before_median = round(float(np.median(series[:onset])), 4)
+        after_median = round(float(np.median(series[onset:])), 4)
+
+    return {
+        "percentiles": percentiles,
+        "rolling_median": (round(float(rolling[0]), 4), round(float(rolling[-1]), 4)),
+        "onset_index": onset + 1 if onset is not None else None,
+        "confidence": round(confidence, 4),
+        "before_median": before_median,
+        "after_median": after_median,
+    }
+
+
+def rolling_median(series):
+    """Returns the rolling median of the series (one value per full window)."""
+    window = int(series.size * ROLLING_WINDOW_FRACTION)
+    window = min(max(window, MIN_ROLLING_WINDOW), MAX_ROLLING_WINDOW, series.size)
+    windows = np.lib.stride_tricks.sliding_window_view(series, window)
+    return np.median(windows, axis=1)
+
+
+def detect_change_point(series):
+    """
+    Finds the most likely point where the distribution of the series shifts, using Pettitt's test.
+
+    The test works on ranks, so a single outlier cannot trigger it, and a shift is found wherever it starts
+    instead of only at fixed batch boundaries.
+
+    :return: (onset, confidence). onset is the 0-based index of the first value after the change (None if the
+             series has fewer than 3 values), confidence is 1 - p-value of the test.
+    """
+    n = series.size
+    if n < 3:
+        return None, 0.0
+
+    # Average ranks, so ties (common with millisecond rounding) don't bias the statistic
+    order = np.argsort(series, kind="mergesort")
+    sorted_values = series[order]
+    ranks = np.empty(n, dtype=float)
+    ranks[order] = np.arange(1, n + 1, dtype=float)
+    _, group_starts, group_counts = np.unique(sorted_values, return_index=True, return_counts=True)
+    average_ranks = group_starts + (group_counts + 1) / 2.0
+    ranks[order] = np.repeat(average_ranks, group_counts)
+
+    # U_t = 2 * (sum of the first t ranks) - t * (n + 1), for splits after positions 1..n-1
+    t = np.arange(1, n, dtype=float)
+    statistic = 2.0 * np.cumsum(ranks)[:-1] - t * (n + 1)
+    split = int(np.argmax(np.abs(statistic)))
+    k = abs(statistic[split])
+
+    p_value = min(1.0, 2.0 * np.exp(-6.0 * k ** 2 / (float(n) ** 3 + float(n) ** 2)))
+    return split + 1, float(1.0 - p_value)
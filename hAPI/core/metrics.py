@@ -0,0 +1,229 @@
+import threading
+import time
+
+class ScanMetrics:
+    """
+    Aggregates the request timings of a scan per module. Register record_request as a request hook of
+    the HTTP client (see HTTPClient.add_request_hook) and record_module for the wall time of each module.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    # Title of the report section written by format_results
+    SECTION_TITLE = "Scan Performance"
+
+    # Share of the scan during which the request slots were busy waiting for responses, above which the
+    # target is considered the bottleneck
+    BUSY_SLOTS_TARGET_BOUND = 0.7
+
+    def __init__(self, concurrency):
+        """
+        :param concurrency: Number of requests the client may have in flight at once.
+        """
+        self.concurrency = max(1, concurrency or 1)
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._modules = {}
+
+    def _module(self, name):
+        if name not in self._modules:
+            self._modules[name] = {
+                "requests": 0, "errors": 0, "bytes": 0, "new_connections": 0, "status_codes": {},
+                "connect_ms": 0.0, "tls_ms": 0.0, "wait_ms": 0.0, "download_ms": 0.0, "ttfb_ms": [], "wall_s": None,
+            }
+        return self._modules[name]
+
+    def record_request(self, timing):
+        """Request hook: adds one request to the totals of its module."""
+        with self._lock:
+            stats = self._module(timing["module"] or "other")
+            stats["requests"] += 1
+            stats["bytes"] += timing["bytes"]
+            stats["new_connections"] += 1 if timing["new_connection"] else 0
+            stats["connect_ms"] += timing["connect_ms"]
+            stats["tls_ms"] += timing["tls_ms"]
+            stats["wait_ms"] += timing["wait_ms"]
+            stats["download_ms"] += timing["download_ms"]
+            stats["ttfb_ms"].append(timing["ttfb_ms"])
+            if timing["error"]:
+                stats["errors"] += 1
+            else:
+                status_class = f"{timing['status_code'] // 100}xx"
+                stats["status_codes"][status_class] = stats["status_codes"].get(status_class, 0) + 1
+
+    def record_module(self, name, wall_s):
+        """Records how long a module ran."""
+        with self._lock:
+            self._module(name)["wall_s"] = wall_s
+
+    def snapshot(self):
+        """Returns the raw per-module totals, to be merged into the metrics of another process (see merge)."""
+        with self._lock:
+            return {name: dict(stats, status_codes=dict(stats["status_codes"]), ttfb_ms=list(stats["ttfb_ms"]))
+                    for name, stats in self._modules.items()}
+
+    def merge(self, snapshot):
+        """
+        Adds the totals of a snapshot, e.g. of a shard process. Modules that ran in several processes at once keep
+        the longest wall time.
+        """
+        with self._lock:
+            for name, other in snapshot.items():
+                stats = self._module(name)
+                for key in ("requests", "errors", "bytes", "new_connections", "connect_ms", "tls_ms", "wait_ms", "download_ms"):
+                    stats[key] += other[key]
+                stats["ttfb_ms"].extend(other["ttfb_ms"])
+                for status_class, count in other["status_codes"].items():
+                    stats["status_codes"][status_class] = stats["status_codes"].get(status_class, 0) + count
+                if other["wall_s"] is not None:
+                    stats["wall_s"] = max(stats["wall_s"] or 0, other["wall_s"])
+
+    def finish(self):
+        """Marks the end of the scan."""
+        self.finished_at = time.perf_counter()
+
+    def summary(self):
+        """Returns the metrics of the scan as a JSON-serializable dictionary, with totals and per-module values."""
+        with self._lock:
+            wall_s = (self.finished_at or time.perf_counter()) - self.started_at
+            modules = {name: self._summarize(stats, stats["wall_s"]) for name, stats in self._modules.items()}
+            totals = {"requests": 0, "errors": 0, "bytes": 0, "new_connections": 0, "status_codes": {},
+                      "connect_ms": 0.0, "tls_ms": 0.0, "wait_ms": 0.0, "download_ms": 0.0, "ttfb_ms": []}
+            for stats in self._modules.values():
+                for key in ("requests", "errors", "bytes", "new_connections", "connect_ms", "tls_ms", "wait_ms", "download_ms"):
+                    totals[key] += stats[key]
+                totals["ttfb_ms"].extend(stats["ttfb_ms"])
+                for status_class, count in stats["status_codes"].items():
+                    totals["status_codes"][status_class] = totals["status_codes"].get(status_class, 0) + count
+            total = self._summarize(totals, wall_s)
+
+        busy_s = (sum(totals["ttfb_ms"]) + totals["download_ms"]) / 1000
+        total["busy_slots"] = round(busy_s / (wall_s * self.concurrency), 4) if wall_s else 0
+        return {
+            "wall_s": round(wall_s, 3),
+            "concurrency": self.concurrency,
+            "totals": total,
+            "modules": modules,
+            "bottleneck": self._bottleneck(total),
+        }
+
+    def _summarize(self, stats, wall_s):
+        requests = stats["requests"]
+        ttfb = sorted(stats["ttfb_ms"])
+
+        def mean(value):
+            return round(value / requests, 3) if requests else None
+
+        return {
+            "requests": requests,
+            "errors": stats["errors"],
+            "bytes": stats["bytes"],
+            "status_codes": dict(sorted(stats["status_codes"].items())),
+            "wall_s": round(wall_s, 3) if wall_s is not None else None,
+            "requests_per_s": round(requests / wall_s, 2) if wall_s else None,
+            "new_connections": stats["new_connections"],
+            "reused_connections": requests - stats["new_connections"],
+            "mean_connect_ms": mean(stats["connect_ms"]),
+            "mean_tls_ms": mean(stats["tls_ms"]),
+            "mean_wait_ms": mean(stats["wait_ms"]),
+            "mean_ttfb_ms": mean(sum(ttfb)),
+            "mean_download_ms": mean(stats["download_ms"]),
+            "ttfb_ms": {
+                f"p{percentile}": round(ttfb[min(len(ttfb) - 1, len(ttfb) * percentile // 100)], 3) if ttfb else None
+                for percentile in self.PERCENTILES
+            },
+        }
+
+    def _bottleneck(self, total):
+        """Tells whether the target or hAPI limited the speed of the scan."""
+        if not total["requests"]:
+            return "No requests were sent."
+        if total["mean_wait_ms"] > total["mean_ttfb_ms"]:
+            return (f"hAPI's limits: requests waited longer for a free slot or the rate controller (mean {total['mean_wait_ms']} ms) "
+                    f"than for the target to answer (mean {total['mean_ttfb_ms']} ms). Raise --concurrency, --host-connections "
+                    "or --max-rps if the target can take more load.")
+        busy = total["busy_slots"]
+        if busy >= self.BUSY_SLOTS_TARGET_BOUND:
+            return (f"Target: the request slots were busy waiting for responses {busy:.0%} of the scan "
+                    f"(p99 time to first byte {total['ttfb_ms']['p99']} ms). More concurrency only helps if the target can handle it.")
+        return (f"hAPI: the request slots were busy only {busy:.0%} of the scan. The rest of the time went into hAPI itself "
+                "(processing responses, running checks) or into modules that send their requests one at a time.")
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label_value}"' for key, label_value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        modules = summary["modules"]
+        metric("hapi_scan_duration_seconds", "gauge", "Wall time of the scan.", [({}, summary["wall_s"])])
+        metric("hapi_requests_total", "counter", "Requests sent over the network.",
+               [({"module": name, "status": status_class}, count)
+                for name, stats in modules.items() for status_class, count in stats["status_codes"].items()])
+        metric("hapi_request_errors_total", "counter", "Requests that failed without a response.",
+               [({"module": name}, stats["errors"]) for name, stats in modules.items()])
+        metric("hapi_response_bytes_total", "counter", "Bytes of response bodies received.",
+               [({"module": name}, stats["bytes"]) for name, stats in modules.items()])
+        metric("hapi_new_connections_total", "counter", "Requests that opened a new connection.",
+               [({"module": name}, stats["new_connections"]) for name, stats in modules.items()])
+        metric("hapi_module_duration_seconds", "gauge", "Wall time of each module.",
+               [({"module": name}, stats["wall_s"]) for name, stats in modules.items() if stats["wall_s"] is not None])
+        for phase, help_text in (("connect", "TCP connect"), ("tls", "TLS handshake"), ("wait", "waiting for a free slot or the rate controller"),
+                                 ("download", "reading response bodies")):
+            metric(f"hapi_{phase}_seconds_total", "counter", f"Time spent on {help_text}.",
+                   [({"module": name}, round((stats[f"mean_{phase}_ms"] or 0) * stats["requests"] / 1000, 6)) for name, stats in modules.items()])
+        metric("hapi_ttfb_seconds", "summary", "Time from sending a request until its response headers arrived.",
+               [({"module": name, "quantile": str(percentile / 100)}, round(stats["ttfb_ms"][f"p{percentile}"] / 1000, 6))
+                for name, stats in modules.items() if stats["requests"] for percentile in self.PERCENTILES])
+        for name, stats in modules.items():
+            lines.append(f'hapi_ttfb_seconds_sum{{module="{name}"}} {round((stats["mean_ttfb_ms"] or 0) * stats["requests"] / 1000, 6)}')
+            lines.append(f'hapi_ttfb_seconds_count{{module="{name}"}} {stats["requests"]}')
+        return "\n".join(lines) + "\n"
+
+    def format_results(self):
+        """Formats the metrics as a report section, like the modules' format_results."""
+        summary = self.summary()
+        rows = []
+        for name, stats in list(summary["modules"].items()) + [("Total", summary["totals"])]:
+            ttfb = stats["ttfb_ms"]
+            rows.append([
+                name,
+                stats["requests"],
+                stats["errors"],
+                stats["wall_s"],
+                stats["requests_per_s"],
+                f"{stats['new_connections']} / {stats['reused_connections']}",
+                f"{stats['mean_connect_ms']} / {stats['mean_tls_ms']}" if stats["requests"] else None,
+                stats["mean_wait_ms"],
+                f"{ttfb['p50']} / {ttfb['p90']} / {ttfb['p99']}" if stats["requests"] else None,
+                stats["mean_download_ms"],
+                stats["bytes"],
+            ])
+
+        description_paragraphs = [
+            f"<strong>Bottleneck: {summary['bottleneck']}</strong>",
+            f'''The scan took {summary['wall_s']} s with up to {summary['concurrency']} requests in flight. Connect and TLS times
+            are only paid by requests that opened a new connection. Wait is the time a request spent queued for a free slot or
+            the rate controller. Time to first byte (TTFB) runs from sending the request until the response headers arrived and
+            includes connect and TLS times.''',
+        ]
+
+        return {
+            "module": self.SECTION_TITLE,
+            "description_paragraphs": description_paragraphs,
+            "references": [],
+            "remediation_paragraphs": [],
+            "verification_commands": [],
+            "table": {
+                "headers": ["Module", "Requests", "Errors", "Wall Time (s)", "Requests/s", "New / Reused Connections",
+                            "Mean Connect / TLS (ms)", "Mean Wait (ms)", "TTFB p50 / p90 / p99 (ms)", "Mean Download (ms)", "Bytes"],
+                "rows": rows,
+            }
+        }
@@ -1,29 +1,149 @@
+import ast
 import importlib
+import os
 import pkgutil
 import modules
 
+# Names that may appear as 'type=' in a module's add_arguments
+ARGUMENT_TYPES = {"int": int, "float": float, "str": str}
+
+
+def _class_name(module_name):
+    """Assumes each module defines a class with the same name as the file, converted from snake_case to CamelCase."""
+    return "".join(word.capitalize() for word in module_name.split("_"))
+
+
 def load_modules():
     """
     Dynamically loads all security modules from the 'modules' package.
 
     :return: Dictionary {module_name: module_class}
     """
-    loaded_modules = {}
+    return ModuleRegistry().load_all()
+
+
+class ModuleRegistry:
+    """
+    Lists the security modules in the 'modules' package and their CLI arguments without importing them.
+
+    Module arguments are read from the source of each module's add_arguments method. Modules are only imported
+    when they are about to run, or when their add_arguments is too dynamic to be read statically.
+    """
 
-    package_path = modules.__path__
-    package_name = modules.__name__
+    def __init__(self):
+        self._names = [module_name for _, module_name, _ in pkgutil.iter_modules(modules.__path__)]
+        self._argument_specs = {}
 
-    for _, module_name, _ in pkgutil.iter_modules(package_path):
-        full_module_name = f"{package_name}.{module_name}"
+    def names(self):
+        """Returns the names of all available modules."""
+        return list(self._names)
+
+    def __contains__(self, module_name):
+        return module_name in self._names
+
+    def load(self, module_name):
+        """Imports a module and returns its class, or None if the class could not be found."""
+        full_module_name = f"{modules.__name__}.{module_name}"
         module = importlib.import_module(full_module_name)
-        
-        # Assumes each module defines a class with the same name as the file
-        class_name = "".join(word.capitalize() for word in module_name.split("_"))  # Convert snake_case to CamelCase
-        module_class = getattr(module, class_name, None)
 
-        if module_class:
-            loaded_modules[module_name] = module_class
-        else:
+        class_name = _class_name(module_name)
+        module_class = getattr(module, class_name, None)
+        if module_class is None:
             print(f"Warning: Could not find class '{class_name}' in module '{full_module_name}'")
+        return module_class
+
+    def load_all(self):
+        """Imports all modules. Returns a dictionary {module_name: module_class}."""
+        loaded_modules = {}
+        for module_name in self._names:
+            module_class = self.load(module_name)
+            if module_class:
+                loaded_modules[module_name] = module_class
+        return loaded_modules
+
+    def add_arguments(self, module_name, parser):
+        """Adds the module-specific CLI arguments of a module to an argparse parser."""
+        if module_name not in self._argument_specs:
+            self._argument_specs[module_name] = self._read_argument_specs(module_name)
+
+        specs = self._argument_specs[module_name]
+        if specs is None:
+            # Could not be read statically, import the module and let it add its own arguments
+            module_class = self.load(module_name)
+            if module_class and hasattr(module_class, "add_arguments"):
+                module_class.add_arguments(parser)
+            return
+
+        for args, kwargs in specs:
+            parser.add_argument(*args, **kwargs)
+
+    def _read_argument_specs(self, module_name):
+        """
+        Reads the parser.add_argument(...) calls of the module's add_arguments method from its source.
+
+        :return: List of (args, kwargs) tuples, or None if the method does anything that can't be evaluated statically.
+        """
+        source_file = os.path.join(modules.__path__[0], f"{module_name}.py")
+        try:
+            with open(source_file, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=source_file)
+        except (OSError, SyntaxError):
+            return None
+
+        class_node = next((node for node in tree.body
+                           if isinstance(node, ast.ClassDef) and node.name == _class_name(module_name)), None)
+        if class_node is None:
+            return None
+
+        # Class-level constants, for help strings such as f"... (default: {cls.DEFAULT_WORKERS})"
+        constants = {}
+        for node in class_node.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                try:
+                    constants[node.targets[0].id] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass
+
+        method = next((node for node in class_node.body
+                       if isinstance(node, ast.FunctionDef) and node.name == "add_arguments"), None)
+        if method is None:
+            return []
+
+        specs = []
+        for statement in method.body:
+            if not isinstance(statement, ast.Expr):
+                return None
+            call = statement.value
+            if isinstance(call, ast.Constant) and isinstance(call.value, str):
+                continue  # Docstring
+            if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "add_argument"):
+                return None
+            try:
+                args = tuple(_evaluate(arg, constants) for arg in call.args)
+                kwargs = {keyword.arg: _evaluate(keyword.value, constants) for keyword in call.keywords}
+            except ValueError:
+                return None
+            if None in kwargs:
+                return None  # **kwargs expansion
+            specs.append((args, kwargs))
+        return specs
+
 
-    return loaded_modules
\ No newline at end of file
+def _evaluate(node, constants):
+    """Evaluates a literal, an argument type, a class constant or an f-string made of those. Raises ValueError otherwise."""
+    if isinstance(node, ast.Name) and node.id in ARGUMENT_TYPES:
+        return ARGUMENT_TYPES[node.id]
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+            and node.value.id == "cls" and node.attr in constants):
+        return constants[node.attr]
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                if value.conversion != -1 or value.format_spec is not None:
+                    raise ValueError("Unsupported f-string formatting")
+                parts.append(str(_evaluate(value.value, constants)))
+            else:
+                parts.append(value.value)
+        return "".join(parts)
+    return ast.literal_eval(node)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+class AdaptiveRateController:
+    """
+    Feedback-driven throughput controller (additive increase, multiplicative decrease).
+
+    Every successful response slowly raises the allowed concurrency and request rate. Responses that signal
+    overload (429, 503, a Retry-After header), a sharp rise in latency or requests that failed without a response
+    (timeouts, dropped connections) cut both in half, and Retry-After pauses all requests for the requested time.
+    """
+
+    INITIAL_CONCURRENCY = 2
+    INITIAL_RPS = 10.0
+    MIN_RPS = 1.0
+    RPS_STEP = 5.0  # Requests per second added per window of successful responses
+    DECREASE_FACTOR = 0.5
+    LATENCY_FACTOR = 2.0  # Latency this many times above the best observed latency counts as overload...
+    MIN_LATENCY_INCREASE = 0.05  # ...if it is also at least this many seconds slower, so jitter on fast targets is ignored
+    DECREASE_COOLDOWN = 0.25  # Minimum number of seconds between two decreases
+    LATENCY_SMOOTHING = 0.2
+    MAX_RETRY_AFTER = 60.0  # seconds
+    OVERLOAD_STATUS_CODES = {429, 503}
+
+    def __init__(self, max_concurrency, max_rps=None, adaptive=True):
+        """
+        :param max_concurrency: Upper bound for the number of requests in flight.
+        :param max_rps: Upper bound for the request rate (requests per second). None means no ceiling.
+        :param adaptive: If False, the controller only enforces max_rps and max_concurrency.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_rps = max_rps
+        self.adaptive = adaptive
+
+        if adaptive:
+            self.concurrency = float(min(self.INITIAL_CONCURRENCY, self.max_concurrency))
+            self.rps = min(self.INITIAL_RPS, max_rps) if max_rps else self.INITIAL_RPS
+        else:
+            self.concurrency = float(self.max_concurrency)
+            self.rps = max_rps
+
+        self._in_flight = 0
+        self._next_send = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency = None
+        self._best_latency = None
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Blocks until the current concurrency and rate limits allow another request. Returns the start time."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self._in_flight >= int(self.concurrency):
+                    self._cond.wait()
+                    continue
+                if self.rps:
+                    if now < self._next_send:
+                        self._cond.wait(self._next_send - now)
+                        continue
+                    self._next_send = max(now, self._next_send) + 1.0 / self.rps
+                self._in_flight += 1
+                return now
+
+    def release(self, started_at, response=None):
+        """
+        Reports the outcome of a request started with acquire().
+
+        :param started_at: The value returned by acquire().
+        :param response: The response, or None if the request failed without one.
+        """
+        latency = time.monotonic() - started_at
+        with self._cond:
+            self._in_flight -= 1
+            if self.adaptive:
+                if response is None:
+                    self._decrease(time.monotonic())
+                else:
+                    self._on_response(response, latency)
+            self._cond.notify_all()
+
+    def _on_response(self, response, latency):
+        """Adjusts the limits based on a single response. Called with the lock held."""
+        retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+        overloaded = response.status_code in self.OVERLOAD_STATUS_CODES or retry_after is not None
+
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.LATENCY_SMOOTHING * (latency - self._latency)
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        elif (self._latency > self._best_latency * self.LATENCY_FACTOR
+              and self._latency - self._best_latency > self.MIN_LATENCY_INCREASE):
+            overloaded = True
+
+        now = time.monotonic()
+        if overloaded:
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + min(retry_after, self.MAX_RETRY_AFTER))
+            self._decrease(now)
+        else:
+            # One step per window of concurrency successful responses
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            self.rps += self.RPS_STEP / self.concurrency
+            if self.max_rps:
+                self.rps = min(self.rps, self.max_rps)
+
+    def _decrease(self, now):
+        """Cuts concurrency and request rate in half. Called with the lock held."""
+        # Responses to requests already in flight carry the same signal, so back off at most once per latency window
+        if now - self._last_decrease > max(self.DECREASE_COOLDOWN, 2 * (self._latency or 0)):
+            self._last_decrease = now
+            self.concurrency = max(1.0, self.concurrency * self.DECREASE_FACTOR)
+            self.rps = max(self.MIN_RPS, self.rps * self.DECREASE_FACTOR)
+            # Latency measured under overload is not a useful baseline anymore
+            self._latency = self._best_latency
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Returns the Retry-After delay in seconds, or None if the header is missing or not a number."""
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form, back off for one second
+            return 1.0
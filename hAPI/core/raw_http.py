@@ -0,0 +1,417 @@
+import select
+import socket
+import ssl
+import threading
+import time
+from collections import deque, namedtuple
+from urllib.parse import urlsplit
+from requests.utils import requote_uri
+from exceptions import CircuitOpenError, RequestFailedError, ScanDeadlineError
+
+MAX_LINE_LENGTH = 65536
+
+# Status code and headers (lowercase names) of a response read by RawHTTPProber
+RawResponse = namedtuple("RawResponse", ["status_code", "headers"])
+
+
+class ConnectionClosedError(Exception):
+    """The server closed the connection before answering all pipelined requests."""
+
+
+class RawHTTPProber:
+    """
+    Lean HTTP/1.1 client for probes that only need the status code of many small requests.
+
+    Requests are written to keep-alive sockets exactly as given (the verb is not normalized, so non-standard
+    verbs like TRACK or MKCALENDAR are sent as written) and up to pipeline_depth requests are pipelined per
+    connection. Only the status line and headers are parsed, bodies are skipped. A connection that closes
+    before answering every pipelined request is reopened and the unanswered requests are sent again; if the
+    server drops pipelined requests without announcing it (see _RawConnection.exchange), it stops pipelining.
+
+    Only safe verbs (REPLAYABLE_VERBS) are pipelined or sent again (RFC 9112, section 9.3). Any other verb is
+    sent alone, once every earlier response was read, on a keep-alive connection that the server hasn't
+    closed, and recorded as failed if the connection ends without a response.
+
+    The prober takes the target, headers, cookies, TLS verification, timeouts, deadline, circuit breaker and
+    request hooks from an HTTPClient, and every batch in flight holds one of the client's request slots.
+    """
+
+    DEFAULT_PIPELINE_DEPTH = 8
+
+    # Attempts per request before it is recorded as failed
+    MAX_ATTEMPTS = 3
+
+    # Safe verbs, which can be pipelined and sent again when the connection ends before their response
+    REPLAYABLE_VERBS = {"GET", "HEAD", "OPTIONS", "TRACE", "QUERY", "PROPFIND", "SEARCH"}
+
+    # Verbs after which the server may switch protocols, so the connection isn't used again
+    CONNECTION_ENDING_VERBS = {"CONNECT"}
+
+    def __init__(self, http_client, pipeline_depth=None, connections=1):
+        """
+        :param http_client: The HTTPClient whose target and settings are used (see unsupported_reason).
+        :param pipeline_depth: Maximum number of requests in flight on one connection (default: 8).
+        :param connections: Number of connections opened to the target.
+        """
+        self.http_client = http_client
+        self.pipeline_depth = max(1, pipeline_depth or self.DEFAULT_PIPELINE_DEPTH)
+        self.connections = max(1, connections)
+
+        url = urlsplit(http_client.base_url)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.base_path = url.path.rstrip("/")
+        default_port = (url.scheme == "https" and self.port == 443) or (url.scheme == "http" and self.port == 80)
+        self.host_header = url.netloc if not default_port else url.hostname
+        self.netloc = url.netloc  # Key of the client's per-host request slots
+        self.ssl_context = self._create_ssl_context(http_client.session.verify) if url.scheme == "https" else None
+
+        timeout = http_client.timeout
+        self.connect_timeout, self.read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self._queue = deque()
+        self._queue_lock = threading.Lock()
+
+    @staticmethod
+    def unsupported_reason(http_client):
+        """Returns why the raw prober can't replace the client's requests, or None if it can."""
+        if urlsplit(http_client.base_url).scheme not in ("http", "https"):
+            return "the target URL is not http:// or https://"
+        if http_client.session.proxies:
+            return "a proxy is configured"
+        if getattr(http_client, "rate_controller", None) is not None:
+            return "the request rate is controlled (--adaptive-rate/--max-rps)"
+        return None
+
+    def probe(self, probes, on_result):
+        """
+        Sends every probe and reports its outcome as soon as it is known.
+
+        :param probes: List of (path, verb) tuples.
+        :param on_result: Called from the connection threads with (path, verb, RawResponse or RequestFailedError).
+        """
+        with self._queue_lock:
+            self._queue.extend((path, verb, 0) for path, verb in probes)
+        self._certificate_error = None
+
+        workers = [
+            threading.Thread(target=self._run_connection, args=(on_result,), name=f"hapi-raw-{index}", daemon=True)
+            for index in range(min(self.connections, max(1, len(probes))))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if self._certificate_error:
+            # Same as HTTPClient: no retry or other probe can get past an untrusted certificate
+            print(f"Untrusted certificate error:\n{self._certificate_error}.\n\nTo disable certificate verification, use --ignore-ssl. This will expose your traffic to man-in-the-middle attacks. Exiting.")
+            raise SystemExit(1)
+
+    def _run_connection(self, on_result):
+        """Works through the queue on one connection. Every batch holds one of the client's request slots while it is sent."""
+        limiter = getattr(self.http_client, "limiter", None)
+        connection = None
+        depth = self.pipeline_depth
+        try:
+            while not self._certificate_error:
+                batch = self._next_batch(depth, on_result)
+                if not batch:
+                    return
+                if limiter:
+                    limiter.acquire(self.netloc)
+                try:
+                    alone = not self.is_replayable(batch[0][1])
+                    if alone and connection is not None and connection.is_dropped():
+                        connection.close()  # Never send a non-replayable request on a connection the server closed
+                        connection = None
+                    if connection is None:
+                        try:
+                            connection = _RawConnection(self)
+                        except ssl.SSLCertVerificationError as e:
+                            self._certificate_error = e
+                            return
+                        except OSError as e:
+                            self._requeue(batch, on_result, self._describe_error(e))
+                            continue
+
+                    answered, reusable = connection.exchange(batch, on_result)
+                    if reusable:
+                        continue
+                    connection_error = connection.error
+                    pipeline_dropped = connection.pipeline_dropped
+                    connection.close()
+                    connection = None
+                    if answered < len(batch) and alone:
+                        # The request may have reached the server, so it isn't sent again
+                        self._fail(batch, on_result, self._describe_error(connection_error), resent=False)
+                    elif answered < len(batch):
+                        if pipeline_dropped:
+                            depth = 1  # The server closes the connection instead of answering pipelined requests
+                        # Requests that got no answer at all count as a failed attempt, the others were cut off by
+                        # the server ending the connection and are simply sent again
+                        reason = self._describe_error(connection_error) if answered == 0 else None
+                        self._requeue(batch[answered:], on_result, reason)
+                finally:
+                    if limiter:
+                        limiter.release(self.netloc)
+                    self._release_trials(batch)
+        finally:
+            if connection:
+                connection.close()
+
+    def _next_batch(self, depth, on_result):
+        """Takes up to depth probes from the queue. Probes of endpoints with an open circuit fail right away."""
+        batch = []
+        breaker = self.http_client.circuit_breaker
+        while len(batch) < depth:
+            with self._queue_lock:
+                if not self._queue:
+                    break
+                if batch and not self.is_replayable(self._queue[0][1]):
+                    break  # Sent alone, in the next batch
+                path, verb, attempts = self._queue.popleft()
+            try:
+                self.http_client._check_deadline()
+            except ScanDeadlineError as e:
+                on_result(path, verb, e)
+                continue
+            endpoint = path.split("?", 1)[0]
+            if breaker and not breaker.allow(endpoint):
+                reason = self.http_client.failed_endpoints.get(endpoint, "unknown error")
+                on_result(path, verb, CircuitOpenError(f"Not sent, earlier requests failed repeatedly ({reason})"))
+                continue
+            batch.append((path, verb, attempts))
+            if not self.is_replayable(verb):
+                break
+        return batch
+
+    def _requeue(self, probes, on_result, reason=None):
+        """
+        Puts unanswered probes back at the front of the queue. With a reason, the attempt counts as failed and
+        probes that used up MAX_ATTEMPTS are recorded as failed instead.
+        """
+        retry = []
+        for path, verb, attempts in probes:
+            if reason:
+                attempts += 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    self._fail([(path, verb, attempts)], on_result, reason)
+                    continue
+            retry.append((path, verb, attempts))
+        with self._queue_lock:
+            self._queue.extendleft(reversed(retry))
+
+    def _fail(self, probes, on_result, reason, resent=True):
+        """Records the probes as failed and reports them to the hooks and on_result."""
+        for path, verb, attempts in probes:
+            if resent:
+                error = RequestFailedError(f"{reason} after {attempts} attempt(s)")
+            else:
+                error = RequestFailedError(f"{reason} before the response, {verb} requests are not sent again")
+            self.http_client._record_failure(path.split("?", 1)[0], reason)
+            _report(self.http_client, verb, path, error=str(error))
+            on_result(path, verb, error)
+
+    @classmethod
+    def is_replayable(cls, verb):
+        """Whether requests with the verb can be pipelined and sent again."""
+        return verb.upper() in cls.REPLAYABLE_VERBS
+
+    def _release_trials(self, batch):
+        """Gives up the circuit breaker trials of probes that were sent again or not at all (see CircuitBreaker.release)."""
+        breaker = self.http_client.circuit_breaker
+        if breaker:
+            for path, _, _ in batch:
+                breaker.release(path.split("?", 1)[0])
+
+    @staticmethod
+    def _describe_error(error):
+        return "Timed out" if isinstance(error, socket.timeout) else "Connection failed"
+
+    @staticmethod
+    def _create_ssl_context(verify):
+        context = ssl.create_default_context()
+        if verify is False:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        elif isinstance(verify, str):
+            context.load_verify_locations(verify)
+        context.set_alpn_protocols(["http/1.1"])
+        return context
+
+    def build_request(self, path, verb):
+        """Returns the bytes of a request, with the session's headers and cookies, like requests would send them."""
+        session = self.http_client.session
+        lines = [f"{verb} {requote_uri(self.base_path + path)} HTTP/1.1", f"Host: {self.host_header}"]
+        lines.extend(f"{name}: {value}" for name, value in session.headers.items() if value is not None)
+        cookies = "; ".join(f"{cookie.name}={cookie.value}" for cookie in session.cookies)
+        if cookies:
+            lines.append(f"Cookie: {cookies}")
+        if verb.upper() not in ("GET", "HEAD"):
+            lines.append("Content-Length: 0")  # Like requests, for requests without a body
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class _RawConnection:
+    """One keep-alive connection of a RawHTTPProber."""
+
+    def __init__(self, prober):
+        self.prober = prober
+        self.client = prober.http_client
+        started_at = time.perf_counter()
+        sock = socket.create_connection((prober.host, prober.port), timeout=prober.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connect_ms = (time.perf_counter() - started_at) * 1000
+        self.tls_ms = 0
+        if prober.ssl_context:
+            started_at = time.perf_counter()
+            sock = prober.ssl_context.wrap_socket(sock, server_hostname=prober.host)
+            self.tls_ms = (time.perf_counter() - started_at) * 1000
+        sock.settimeout(prober.read_timeout)
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.new = True
+        self.error = None
+        self.pipeline_dropped = False
+
+    def exchange(self, batch, on_result):
+        """
+        Writes the batch of requests at once and reads their responses in order.
+
+        Sets error if the connection failed. Sets pipeline_dropped if the server closed or reset the connection
+        after answering at most one request, while more than one was in flight and none of its responses
+        announced the close: the server doesn't answer pipelined requests. A connection ended by a response
+        (Connection: close, a body that is skipped by reconnecting) is no sign of that, and neither is a reused
+        connection that ends before its first response, which the server may have closed while it was idle.
+
+        :return: Tuple of the number of requests that were answered and whether the connection can take the
+                 next batch.
+        """
+        fresh = self.new
+        sent_at = time.perf_counter()
+        try:
+            self.sock.sendall(b"".join(self.prober.build_request(path, verb) for path, verb, _ in batch))
+        except OSError as e:
+            self.error = e
+            return 0, False
+
+        for index, (path, verb, _) in enumerate(batch):
+            try:
+                response, keep_alive, body_bytes = self._read_response(verb)
+            except (OSError, ValueError, ConnectionClosedError) as e:
+                self.error = e
+                self.pipeline_dropped = (
+                    (index == 1 or (index == 0 and fresh)) and len(batch) - index > 1
+                    and isinstance(e, (ConnectionClosedError, ConnectionResetError))
+                )
+                return index, False
+            received_at = time.perf_counter()
+            self._report(path, verb, response.status_code, body_bytes, sent_at, received_at)
+            on_result(path, verb, response)
+            if self.client.circuit_breaker:
+                self.client.circuit_breaker.record_success(path.split("?", 1)[0])
+            if not keep_alive:
+                return index + 1, False
+        return len(batch), True
+
+    def _read_response(self, verb):
+        """Reads the status line and headers and skips the body. Returns (RawResponse, keep-alive, body bytes)."""
+        while True:
+            status_line = self.reader.readline(MAX_LINE_LENGTH)
+            if not status_line:
+                raise ConnectionClosedError()
+            version, status, *_ = status_line.split(None, 2)
+            status_code = int(status)
+            headers = {}
+            while True:
+                line = self.reader.readline(MAX_LINE_LENGTH)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.partition(b":")
+                headers[name.strip().lower()] = value.strip()
+            # Interim responses (100 Continue, 103 Early Hints) are followed by the real one
+            if 100 <= status_code < 200 and status_code != 101:
+                continue
+            break
+
+        response = RawResponse(status_code, {name.decode("latin-1"): value.decode("latin-1") for name, value in headers.items()})
+        connection_header = headers.get(b"connection", b"").lower()
+        keep_alive = connection_header != b"close" if version == b"HTTP/1.1" else connection_header == b"keep-alive"
+        if status_code == 101 or verb.upper() in RawHTTPProber.CONNECTION_ENDING_VERBS:
+            return response, False, 0
+        if verb.upper() == "HEAD" or status_code in (204, 304):
+            return response, keep_alive, 0
+        if b"chunked" in headers.get(b"transfer-encoding", b"").lower():
+            return response, keep_alive, self._skip_chunked_body()
+        if b"content-length" in headers:
+            length = int(headers[b"content-length"])
+            limit = self.client.max_body_bytes
+            if limit is not None and length > limit:
+                return response, False, 0  # Cheaper to reconnect than to read the body
+            self._skip(length)
+            return response, keep_alive, length
+        # No length: the body ends when the server closes the connection
+        return response, False, 0
+
+    def _skip(self, length):
+        while length > 0:
+            data = self.reader.read(min(length, 65536))
+            if not data:
+                raise ConnectionClosedError()
+            length -= len(data)
+
+    def _skip_chunked_body(self):
+        body_bytes = 0
+        while True:
+            size_line = self.reader.readline(MAX_LINE_LENGTH)
+            if not size_line:
+                raise ConnectionClosedError()
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while self.reader.readline(MAX_LINE_LENGTH) not in (b"\r\n", b"\n", b""):
+                    pass
+                return body_bytes
+            self._skip(size + 2)
+            body_bytes += size
+
+    def _report(self, path, verb, status_code, body_bytes, sent_at, received_at):
+        """Reports the request to the client's hooks, like HTTPClient does."""
+        setup_ms = self.connect_ms + self.tls_ms if self.new else 0
+        _report(self.client, verb, path, status_code=status_code, bytes=body_bytes, new_connection=self.new,
+                connect_ms=self.connect_ms if self.new else 0, tls_ms=self.tls_ms if self.new else 0,
+                ttfb_ms=(received_at - sent_at) * 1000 + setup_ms)
+        self.new = False
+
+    def is_dropped(self):
+        """
+        Whether the server closed the idle connection, checked without blocking. An idle connection has nothing to
+        read, so any data (the end of the stream or an unexpected response) means it can't be used anymore.
+        """
+        if self.prober.ssl_context and self.sock.pending():
+            return True
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _report(http_client, verb, path, **timing):
+    """Calls the client's request hooks with the timing of one request (see HTTPClient.add_request_hook)."""
+    if not http_client.request_hooks:
+        return
+    timing = dict({
+        "module": http_client.module, "verb": verb, "path": path, "status_code": None, "error": None,
+        "new_connection": False, "connect_ms": 0, "tls_ms": 0, "wait_ms": 0, "ttfb_ms": 0, "download_ms": 0, "bytes": 0,
+    }, **timing)
+    for hook in http_client.request_hooks:
+        hook(timing)
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class ResponseCache:
+    """
+    LRU cache of HTTP responses with a time-to-live.
+
+    Concurrent lookups of the same key are coalesced: only the first caller sends the request,
+    the others wait for its response.
+    """
+
+    DEFAULT_MAX_SIZE = 1024
+    DEFAULT_TTL = 300  # seconds
+
+    def __init__(self, max_size=None, ttl=None):
+        """
+        :param max_size: Maximum number of responses kept in the cache (default: 1024).
+        :param ttl: Number of seconds a cached response stays valid (default: 300).
+        """
+        self.max_size = max(1, max_size or self.DEFAULT_MAX_SIZE)
+        self.ttl = ttl if ttl is not None else self.DEFAULT_TTL
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(method, url, headers=None, auth=None, params=None):
+        """Builds a cache key from the parts of a request that can change the response."""
+        normalized_headers = tuple(sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items()))
+        normalized_params = tuple(sorted((str(k), str(v)) for k, v in dict(params or {}).items()))
+        normalized_auth = auth if isinstance(auth, tuple) or auth is None else repr(auth)
+        return (method.upper(), url, normalized_headers, normalized_auth, normalized_params)
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the cached response for the key, or calls fetch() to get it.
+
+        :param key: Key built with make_key().
+        :param fetch: Callable that sends the request and returns the response.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return response
+                del self._entries[key]
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = Future()
+                self._in_flight[key] = pending
+                is_owner = True
+            else:
+                is_owner = False
+
+        if not is_owner:
+            return pending.result()
+
+        try:
+            response = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        pending.set_result(response)
+        return response
+
+    def clear(self):
+        """Removes all cached responses."""
+        with self._lock:
+            self._entries.clear()
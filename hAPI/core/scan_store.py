@@ -0,0 +1,317 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from core.user_dirs import ensure_dir, user_data_dir
+
+class ScanStore:
+    """Persists scans and every completed probe to a local SQLite database, so interrupted scans can be resumed."""
+
+    # Name of the store in the per-user data directory, used when no path is given
+    DEFAULT_FILE_NAME = "hapi_scans.db"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scans (
+            scan_id TEXT PRIMARY KEY,
+            target TEXT NOT NULL,
+            spec TEXT NOT NULL,
+            api_title TEXT,
+            modules TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            mode TEXT NOT NULL DEFAULT 'full',
+            base_scan_id TEXT,
+            config_digest TEXT
+        );
+        CREATE TABLE IF NOT EXISTS probes (
+            scan_id TEXT NOT NULL REFERENCES scans (scan_id),
+            module TEXT NOT NULL,
+            probe_key TEXT NOT NULL,
+            endpoint TEXT,
+            value TEXT NOT NULL,
+            completed_at REAL NOT NULL,
+            PRIMARY KEY (scan_id, module, probe_key)
+        );
+        CREATE TABLE IF NOT EXISTS endpoint_fingerprints (
+            scan_id TEXT NOT NULL REFERENCES scans (scan_id),
+            endpoint TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            PRIMARY KEY (scan_id, endpoint)
+        );
+    """
+
+    # Columns added to the scans table after its first version, created on older stores when they are opened
+    SCAN_COLUMNS_ADDED = {
+        "mode": "TEXT NOT NULL DEFAULT 'full'",
+        "base_scan_id": "TEXT",
+        "config_digest": "TEXT",
+    }
+
+    # Probes are committed in batches: after this many, once this many seconds passed since the last commit, when
+    # a module completes (flush) and when the store is closed, e.g. on Ctrl-C
+    COMMIT_EVERY = 200
+    COMMIT_INTERVAL = 1.0  # seconds
+
+    SCAN_FIELDS = ("scan_id", "target", "spec", "api_title", "modules", "status", "started_at", "finished_at", "mode", "base_scan_id", "config_digest")
+
+    def __init__(self, path=None):
+        """
+        Opens (and creates, if needed) the store.
+
+        :param path: Path to the SQLite database file (default: default_path()).
+        """
+        if path is None:
+            path = self.default_path()
+            ensure_dir(os.path.dirname(path))
+        self.path = path
+        # Probes complete on many worker threads, they share one connection behind a lock
+        self._lock = threading.Lock()
+        # Shard processes and batch scans write to the same file, wait for each other instead of failing
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+        self._migrate()
+        self._connection.commit()
+        self._pending = 0  # Probes saved since the last commit
+        self._committed_at = time.monotonic()
+
+    @classmethod
+    def default_path(cls):
+        """Returns the store used when no path is given, in the per-user data directory (e.g. ~/.local/share/hapi)."""
+        return os.path.join(user_data_dir(), cls.DEFAULT_FILE_NAME)
+
+    def _migrate(self):
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(scans)")}
+        for column, definition in self.SCAN_COLUMNS_ADDED.items():
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE scans ADD COLUMN {column} {definition}")
+
+    def create_scan(self, target, spec, api_title, modules, mode="full", base_scan_id=None, config_digest=None):
+        """
+        Records a new scan.
+
+        :param mode: "full", or "incremental" if unchanged endpoints carry their results forward from base_scan_id.
+        :param base_scan_id: The scan an incremental scan carries results forward from.
+        :param config_digest: Hash of the settings that change the results of a scan (see hapi.scan_config_digest).
+                              Incremental scans only carry results forward from scans with the same digest.
+        :return: The ID of the scan, to be passed to --resume.
+        """
+        scan_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO scans (scan_id, target, spec, api_title, modules, status, started_at, mode, base_scan_id, config_digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scan_id, target, spec, api_title, json.dumps(list(modules)), "running", time.time(), mode, base_scan_id, config_digest)
+            )
+            self._connection.commit()
+        return scan_id
+
+    def get_scan(self, scan_id):
+        """Returns the scan as a dictionary, or None if there is no such scan."""
+        return self._fetch_scan("WHERE scan_id = ?", (scan_id,))
+
+    def last_completed_scan(self, target, config_digest=None):
+        """Returns the most recent completed scan of the target with the same configuration digest, or None."""
+        return self._fetch_scan(
+            "WHERE target = ? AND config_digest IS ? AND status = 'completed' ORDER BY started_at DESC LIMIT 1",
+            (target, config_digest)
+        )
+
+    def incremental_scans_since_full(self, target, config_digest=None):
+        """
+        Returns the number of completed incremental scans of the target since its last completed full scan, among
+        the scans with the same configuration digest.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM scans WHERE target = ? AND config_digest IS ? AND status = 'completed' "
+                "AND mode = 'incremental' AND started_at > COALESCE((SELECT MAX(started_at) FROM scans "
+                "WHERE target = ? AND config_digest IS ? AND status = 'completed' AND mode = 'full'), 0)",
+                (target, config_digest, target, config_digest)
+            ).fetchone()
+        return row[0]
+
+    def _fetch_scan(self, condition, parameters):
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(self.SCAN_FIELDS)} FROM scans {condition}", parameters
+            ).fetchone()
+        if row is None:
+            return None
+        scan = dict(zip(self.SCAN_FIELDS, row))
+        scan["modules"] = json.loads(scan["modules"])
+        return scan
+
+    def update_scan(self, scan_id, modules):
+        """Marks a resumed scan as running again, with the modules selected for this run."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE scans SET status = 'running', finished_at = NULL, modules = ? WHERE scan_id = ?",
+                (json.dumps(list(modules)), scan_id)
+            )
+            self._connection.commit()
+
+    def finish_scan(self, scan_id):
+        """Marks the scan as completed."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE scans SET status = 'completed', finished_at = ? WHERE scan_id = ?", (time.time(), scan_id)
+            )
+            self._connection.commit()
+
+    def save_probe(self, scan_id, module, probe_key, value, endpoint=None):
+        """
+        Stores the JSON-serializable result of a completed probe. Probes are committed in batches (see COMMIT_EVERY),
+        in the order they were saved, so a crash loses at most the last batch and never a probe without the
+        state saved before it.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO probes (scan_id, module, probe_key, endpoint, value, completed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (scan_id, module, probe_key, endpoint, json.dumps(value, default=str), time.time())
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_EVERY or time.monotonic() - self._committed_at >= self.COMMIT_INTERVAL:
+                self._commit()
+
+    def flush(self):
+        """Commits the probes saved since the last commit."""
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def _commit(self):
+        self._connection.commit()
+        self._pending = 0
+        self._committed_at = time.monotonic()
+
+    def load_probes(self, scan_id, module):
+        """Returns the completed probes of a module in a scan as a {probe_key: value} dictionary."""
+        return {probe_key: value for probe_key, _, value in self.load_probe_rows(scan_id, module)}
+
+    def load_probe_rows(self, scan_id, module):
+        """Returns the completed probes of a module in a scan as (probe_key, endpoint, value) tuples."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT probe_key, endpoint, value FROM probes WHERE scan_id = ? AND module = ?", (scan_id, module)
+            ).fetchall()
+        return [(probe_key, endpoint, json.loads(value)) for probe_key, endpoint, value in rows]
+
+    def save_fingerprints(self, scan_id, fingerprints):
+        """Stores the {endpoint: fingerprint} dictionary of the schema a scan ran against, replacing earlier ones."""
+        with self._lock:
+            self._connection.execute("DELETE FROM endpoint_fingerprints WHERE scan_id = ?", (scan_id,))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO endpoint_fingerprints (scan_id, endpoint, fingerprint) VALUES (?, ?, ?)",
+                [(scan_id, endpoint, fingerprint) for endpoint, fingerprint in fingerprints.items()]
+            )
+            self._connection.commit()
+
+    def load_fingerprints(self, scan_id):
+        """Returns the {endpoint: fingerprint} dictionary stored for a scan."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT endpoint, fingerprint FROM endpoint_fingerprints WHERE scan_id = ?", (scan_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def checkpoint(self, scan_id, module, base_scan_id=None, unchanged_endpoints=None):
+        """
+        Returns the ModuleCheckpoint of a module in a scan.
+
+        :param base_scan_id: For incremental scans, the scan to carry results forward from.
+        :param unchanged_endpoints: The endpoints whose results may be carried forward.
+        """
+        return ModuleCheckpoint(self, scan_id, module, base_scan_id, unchanged_endpoints)
+
+    def close(self):
+        """Commits the pending probes and closes the store."""
+        with self._lock:
+            try:
+                self._connection.commit()
+            finally:
+                self._connection.close()
+
+
+class ModuleCheckpoint:
+    """
+    A module's view of the store. Modules wrap each probe in probe(): probes completed in an earlier run of
+    the scan return their stored result, all others are run and their result stored as soon as they complete.
+
+    In an incremental scan, probes of unchanged endpoints return the result of the base scan instead of
+    being run. The carried result is stored in the new scan too, so every scan holds its complete results.
+    """
+
+    def __init__(self, store, scan_id, module, base_scan_id=None, unchanged_endpoints=None):
+        self.store = store
+        self.scan_id = scan_id
+        self.module = module
+        self.completed = store.load_probes(scan_id, module)
+        self.carried = {}
+        if base_scan_id:
+            unchanged_endpoints = set(unchanged_endpoints or ())
+            self.carried = {
+                probe_key: value
+                for probe_key, endpoint, value in store.load_probe_rows(base_scan_id, module)
+                if self._is_unchanged(endpoint, value, unchanged_endpoints)
+            }
+
+    @staticmethod
+    def _is_unchanged(endpoint, value, unchanged_endpoints):
+        """
+        A probe can be carried forward if its endpoint is unchanged. Remembered state has no endpoint, it is
+        carried forward unless it names an endpoint that changed (e.g. the sampled endpoints).
+        """
+        if endpoint is not None:
+            return endpoint in unchanged_endpoints
+        named = value if isinstance(value, list) else [value]
+        return all(name in unchanged_endpoints for name in named if isinstance(name, str))
+
+    def probe(self, key, run, endpoint=None):
+        """
+        Returns the stored result of the probe, or runs it and stores its result.
+
+        :param key: String identifying the probe within the module (e.g. "GET /users").
+        :param run: Callable performing the probe. Must return a JSON-serializable result.
+        :param endpoint: The endpoint the probe targets, stored alongside the result.
+        """
+        if key in self.completed:
+            return self.completed[key]
+        value = self.carried[key] if key in self.carried else run()
+        self.store.save_probe(self.scan_id, self.module, key, value, endpoint)
+        # JSON turns tuples into lists, keep fresh and resumed results identical
+        value = json.loads(json.dumps(value, default=str))
+        self.completed[key] = value
+        return value
+
+    def has_result(self, key):
+        """Returns True if probe() would return a stored or carried result instead of running the probe."""
+        return key in self.completed or key in self.carried
+
+    def remember(self, name, compute):
+        """Stores a value the module picked at random (e.g. the sampled endpoints), so a resumed scan reuses it."""
+        return self.probe(f"state:{name}", compute)
+
+    def flush(self):
+        """Commits the module's stored probes, called when the module completes."""
+        self.store.flush()
+
+
+class NullCheckpoint:
+    """Used when the store is disabled: every probe is run and nothing is stored."""
+
+    def probe(self, key, run, endpoint=None):
+        return run()
+
+    def has_result(self, key):
+        return False
+
+    def remember(self, name, compute):
+        return compute()
+
+    def flush(self):
+        pass
@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+class TrafficGate:
+    """
+    Coordinates the modules of scans that run side by side in one process (batch mode). Any number of scans
+    may run their shared modules at once, while an exclusive module runs with no other scan sending traffic.
+    Scans waiting for exclusive access go first, so scans that keep starting can't starve them.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting_exclusive = 0
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive and not self._waiting_exclusive)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._shared -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._waiting_exclusive += 1
+            try:
+                self._condition.wait_for(lambda: not self._exclusive and not self._shared)
+            finally:
+                self._waiting_exclusive -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+class ModuleScheduler:
+    """Runs security modules concurrently on a shared HTTP client, isolating modules that need exclusive access."""
+
+    def __init__(self, gate=None):
+        """
+        :param gate: TrafficGate shared with the schedulers of other scans in the process, so that exclusive
+                     modules also run without traffic from those scans.
+        """
+        self.gate = gate or TrafficGate()
+
+    def run(self, jobs):
+        """
+        Runs all jobs and returns their results in the order the jobs were given.
+
+        Jobs that are not exclusive run concurrently. Exclusive jobs (e.g. timing-sensitive checks such as
+        rate limiting) run afterwards, one at a time, with no other module sending traffic, including the
+        modules of other scans sharing the gate.
+
+        :param jobs: List of (exclusive, callable) tuples in user-selected order.
+        :return: List of the callables' return values, in job order.
+        """
+        results = [None] * len(jobs)
+        shared = [(index, job) for index, (exclusive, job) in enumerate(jobs) if not exclusive]
+        exclusive = [(index, job) for index, (is_exclusive, job) in enumerate(jobs) if is_exclusive]
+
+        if shared:
+            with self.gate.shared():
+                executor = ThreadPoolExecutor(max_workers=len(shared), thread_name_prefix="hapi-module")
+                interrupted = False
+                try:
+                    futures = [(index, executor.submit(job)) for index, job in shared]
+                    for index, future in futures:
+                        results[index] = future.result()
+                except KeyboardInterrupt:
+                    interrupted = True
+                    raise
+                finally:
+                    # On Ctrl-C, abandon the running modules instead of waiting for them to finish
+                    executor.shutdown(wait=not interrupted, cancel_futures=interrupted)
+
+        if exclusive:
+            with self.gate.exclusive():
+                for index, job in exclusive:
+                    results[index] = job()
+
+        return results
@@ -0,0 +1,41 @@
+import hashlib
+
+def shard_of(path, shard_count):
+    """
+    Returns the shard a path belongs to. Based on a hash of the path only, so every process and every
+    machine assigns a path to the same shard, whatever the order of the paths in the schema.
+    """
+    digest = hashlib.sha1(path.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+def partition_paths(openapi_paths, shard_count, shard_index):
+    """Returns the part of the 'paths' dictionary that belongs to the given shard, in schema order."""
+    return {path: path_item for path, path_item in openapi_paths.items() if shard_of(path, shard_count) == shard_index}
+
+def merge_shard_results(shard_results, path_order):
+    """
+    Merges the formatted results of several shards into the results of a single scan.
+
+    :param shard_results: One list of formatted module results per shard, as returned by format_results.
+    :param path_order: The paths of the schema in schema order. Rows of modules that ran in more than one
+                       shard are put back in this order, the rows of each path keep their order.
+    :return: List of formatted module results, in the order in which the modules first appear.
+    """
+    merged = {}
+    shard_counts = {}
+    for results in shard_results:
+        for result in results:
+            name = result["module"]
+            if name not in merged:
+                # Descriptions and references are the same in every shard, only the rows differ
+                merged[name] = dict(result, table=dict(result["table"], rows=list(result["table"]["rows"])))
+                shard_counts[name] = 1
+            else:
+                merged[name]["table"]["rows"].extend(result["table"]["rows"])
+                shard_counts[name] += 1
+
+    positions = {path: position for position, path in enumerate(path_order)}
+    for name, result in merged.items():
+        if shard_counts[name] > 1:
+            result["table"]["rows"].sort(key=lambda row: positions.get(row[0], len(positions)) if row else len(positions))
+    return list(merged.values())
@@ -0,0 +1,30 @@
+import os
+import sys
+
+APP_NAME = "hapi"
+
+
+def user_cache_dir():
+    """Returns the per-user cache directory of hAPI (e.g. ~/.cache/hapi), for data that can be rebuilt."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, APP_NAME, "Cache")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Caches"), APP_NAME)
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), APP_NAME)
+
+
+def user_data_dir():
+    """Returns the per-user data directory of hAPI (e.g. ~/.local/share/hapi), for data that must be kept."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, APP_NAME)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Application Support"), APP_NAME)
+    return os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), APP_NAME)
+
+
+def ensure_dir(path):
+    """Creates the directory, readable by the current user only, and returns it."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
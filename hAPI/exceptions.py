@@ -1,3 +1,15 @@
 class OpenAPISchemaError(Exception):
     """Custom exception for OpenAPI schema-related errors."""
-    pass
\ No newline at end of file
+    pass
+
+class RequestFailedError(Exception):
+    """Raised when a request fails without a response, after all retries. Modules record the probe as errored."""
+    pass
+
+class CircuitOpenError(RequestFailedError):
+    """Raised instead of sending a request to an endpoint that failed repeatedly (see CircuitBreaker)."""
+    pass
+
+class ScanDeadlineError(RequestFailedError):
+    """Raised instead of sending a request once the --scan-deadline has passed."""
+    pass
@@ -1,86 +1,538 @@
-import os
 import sys
 import json
-from core.http_client import HTTPClient
-from core.module_loader import load_modules
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from core.circuit_breaker import CircuitBreaker
+from core.fingerprint import FindingClusterer, ResponseFingerprints
+from core.http_client import AsyncHTTPClient, HTTPClient, InstrumentedHTTPAdapter, RequestLimiter, tcp_keepalive_options
+from core.metrics import ScanMetrics
+from core.module_loader import ModuleRegistry
+from core.rate_controller import AdaptiveRateController
+from core.response_cache import ResponseCache
+from core.scan_store import ScanStore
+from core.scheduler import ModuleScheduler
+from core.sharding import merge_shard_results, partition_paths
 from parsers.openapi_parser import OpenAPIParser
-from reports.html_report import HTMLReport
+from reports.jsonl_report import JSONLReportWriter
 import argparse
 
 def run_hapi(args, module_specific_args):
     """ Main function to run hAPI with parsed arguments. """
-    
-    # Load modules dynamically
-    available_modules = load_modules()
+    if args.shards and args.shards > 1 and args.shard_index is None:
+        run_shards(args, module_specific_args)
+        return
+    run_scan(args, module_specific_args)
+
+def run_scan(args, module_specific_args, limiter=None, adapter=None, gate=None):
+    """
+    Scans a single target and writes its report.
+
+    :param limiter: A RequestLimiter shared with the scans of other targets.
+    :param adapter: An HTTPAdapter shared with the scans of other targets, so they share connection pools.
+    :param gate: A TrafficGate shared with the scans of other targets, so exclusive modules run without their traffic.
+    :return: Summary of the scan, with the API title, scan ID, report file and the row count of each module.
+    """
+    # Modules are only imported once they are selected
+    available_modules = ModuleRegistry()
     
     # Parse OpenAPI schema
-    openapi_parser = OpenAPIParser(args.input)
+    openapi_parsed_schema, parsed_schema = parse_schema(args)
+    selected_modules = select_modules(args, available_modules)
+
+    # Every completed probe is recorded, so an interrupted scan can be resumed
+    scan_store, scan = _open_scan(args, openapi_parsed_schema, parsed_schema["api_title"], selected_modules, module_specific_args)
+
+    http_client = create_http_client(args, limiter, adapter)
+    jobs = create_jobs(args, module_specific_args, available_modules, selected_modules, parsed_schema, http_client, scan_store, scan)
+    summary = {"api_title": parsed_schema["api_title"], "scan_id": scan["scan_id"] if scan else None}
+
+    # Timing of every request, for the scan performance section of the report
+    metrics = ScanMetrics(http_client.concurrency)
+    http_client.add_request_hook(metrics.record_request)
+
+    try:
+        if args.format.upper() == "JSONL":
+            # Rows are written to the report as the modules produce them
+            with open_report_file(parsed_schema["api_title"], args.format) as report_file:
+                writer = JSONLReportWriter(report_file)
+                writer.write_scan(parsed_schema["api_title"], args.url)
+                ModuleScheduler(gate).run([(exclusive, _module_job(name, instance, writer, metrics)) for exclusive, name, instance in jobs])
+                metrics.finish()
+                performance = metrics.format_results()
+                for row in performance["table"]["rows"]:
+                    writer.write_row("scan_performance", row)
+                writer.write_module("scan_performance", dict(performance, table=dict(performance["table"], rows=[])), len(performance["table"]["rows"]))
+            summary["report"] = report_file.name
+        else:
+            # Independent modules run concurrently, results keep the user-selected order
+            results = ModuleScheduler(gate).run([
+                (exclusive, _module_job(name, instance, metrics=metrics, group_findings=args.group_findings)) for exclusive, name, instance in jobs
+            ])
+            summary["modules"] = {result["module"]: len(result["table"]["rows"]) for result in results}
+            metrics.finish()
+
+            # Generate report
+            summary["report"] = generate_report(parsed_schema["api_title"], results + [metrics.format_results()], args.format)
+        summary["performance"] = export_metrics(args, metrics)
+        summary["failed_endpoints"] = report_failures(http_client, scan)
+    except (KeyboardInterrupt, SystemExit):
+        if scan_store:
+            print(f"Scan interrupted. Completed probes were saved, resume with --resume {scan['scan_id']}")
+        raise
+    else:
+        if scan_store:
+            scan_store.finish_scan(scan["scan_id"])
+    finally:
+        if scan_store:
+            scan_store.close()
+    return summary
+
+def run_shards(args, module_specific_args):
+    """
+    Runs every shard of the scan in its own process and generates a single report from the merged results.
+    The shards share the scan in the store, so the whole sharded scan can be resumed with --resume, and their
+    request limits (see _shard_args) and metrics.
+
+    Exclusive modules must not overlap with any other traffic, which the shard processes can't coordinate. They
+    run once in this process after the shards finished, with the full request limits.
+    """
+    openapi_parsed_schema, parsed_schema = parse_schema(args)
+    available_modules = ModuleRegistry()
+    selected_modules = select_modules(args, available_modules)
+    exclusive_modules = [
+        name for name in selected_modules
+        if name in available_modules and getattr(available_modules.load(name), "EXCLUSIVE", False)
+    ]
+
+    scan_store, scan = _open_scan(args, openapi_parsed_schema, parsed_schema["api_title"], selected_modules, module_specific_args)
+    if scan_store:
+        scan_store.close()
+
+    metrics = ScanMetrics(args.concurrency)
+    try:
+        with ProcessPoolExecutor(max_workers=args.shards) as executor:
+            futures = [
+                executor.submit(_run_shard, _shard_args(args, index), module_specific_args, scan)
+                for index in range(args.shards)
+            ]
+            shard_results = []
+            for future in futures:
+                results, shard_metrics = future.result()
+                shard_results.append(results)
+                metrics.merge(shard_metrics)
+        exclusive_results = _run_exclusive_modules(args, module_specific_args, parsed_schema, exclusive_modules, scan, metrics)
+    except (KeyboardInterrupt, SystemExit):
+        if scan_store:
+            print(f"Scan interrupted. Completed probes were saved, resume with --resume {scan['scan_id']} --shards {args.shards}")
+        raise
+
+    metrics.finish()
+
+    # Put the results of the exclusive modules back in the selected order
+    shard_module_results = iter(merge_shard_results(shard_results, list(parsed_schema["paths"])))
+    exclusive_results = iter(exclusive_results)
+    results = [next(exclusive_results) if name in exclusive_modules else next(shard_module_results) for name in selected_modules]
+    if args.group_findings:
+        # The fingerprints stayed in the shard processes, rows are grouped by their content only
+        for module_name, result in zip(selected_modules, results):
+            if hasattr(available_modules.load(module_name), "FINGERPRINT_KEY_COLUMNS"):
+                result["table"]["rows"] = FindingClusterer.group(result["table"]["rows"])
+    if args.format.upper() == "JSONL":
+        with open_report_file(parsed_schema["api_title"], args.format) as report_file:
+            writer = JSONLReportWriter(report_file)
+            writer.write_scan(parsed_schema["api_title"], args.url)
+            for module_name, result in zip(selected_modules, results):
+                for row in result["table"]["rows"]:
+                    writer.write_row(module_name, row)
+                # Like streamed modules, the module line holds the description, the rows are on their own lines
+                writer.write_module(module_name, dict(result, table=dict(result["table"], rows=[])), len(result["table"]["rows"]))
+            performance = metrics.format_results()
+            for row in performance["table"]["rows"]:
+                writer.write_row("scan_performance", row)
+            writer.write_module("scan_performance", dict(performance, table=dict(performance["table"], rows=[])), len(performance["table"]["rows"]))
+    else:
+        generate_report(parsed_schema["api_title"], results + [metrics.format_results()], args.format)
+    export_metrics(args, metrics)
+
+    if scan_store:
+        scan_store = ScanStore(args.store)
+        scan_store.finish_scan(scan["scan_id"])
+        scan_store.close()
+
+def _shard_args(args, index):
+    """
+    Returns the arguments of one shard of a local sharded scan. The request limits are split between the shards,
+    so that together they stay within --concurrency, --host-connections, --pool-maxsize and --max-rps.
+    """
+    def share(limit):
+        return limit // args.shards + (1 if index < limit % args.shards else 0) if limit else limit
+
+    return argparse.Namespace(**dict(
+        vars(args), shard_index=index, concurrency=share(args.concurrency), host_connections=share(args.host_connections),
+        pool_maxsize=share(args.pool_maxsize), max_rps=args.max_rps / args.shards if args.max_rps else args.max_rps
+    ))
+
+def _run_shard(args, module_specific_args, scan):
+    """Runs the modules of one shard in a worker process. Returns their formatted results and a snapshot of the shard's metrics."""
+    available_modules = ModuleRegistry()
+    _, parsed_schema = parse_schema(args)
+    selected_modules = select_modules(args, available_modules)
+
+    scan_store = ScanStore(args.store) if scan else None
+    try:
+        http_client = create_http_client(args)
+        jobs = create_jobs(args, module_specific_args, available_modules, selected_modules, parsed_schema, http_client, scan_store, scan)
+        metrics = ScanMetrics(http_client.concurrency)
+        http_client.add_request_hook(metrics.record_request)
+        # Exclusive modules run in the parent process once the shards finished (see run_shards)
+        results = ModuleScheduler().run([(exclusive, _module_job(name, instance, metrics=metrics)) for exclusive, name, instance in jobs if not exclusive])
+        report_failures(http_client, scan)
+        return results, metrics.snapshot()
+    finally:
+        if scan_store:
+            scan_store.close()
+
+def _run_exclusive_modules(args, module_specific_args, parsed_schema, exclusive_modules, scan, metrics):
+    """
+    Runs the exclusive modules of a local sharded scan, one after another against the whole schema, with the
+    request limits of the whole scan.
+
+    :param metrics: The ScanMetrics of the sharded scan, which records the requests of these modules too.
+    :return: The formatted results of the modules, in the selected order.
+    """
+    if not exclusive_modules:
+        return []
+
+    # Without shards, the modules get the whole schema and the limits aren't split
+    args = argparse.Namespace(**dict(vars(args), shards=None))
+    scan_store = ScanStore(args.store) if scan else None
+    try:
+        http_client = create_http_client(args)
+        http_client.add_request_hook(metrics.record_request)
+        jobs = create_jobs(args, module_specific_args, ModuleRegistry(), exclusive_modules, parsed_schema, http_client, scan_store, scan)
+        results = ModuleScheduler().run([(exclusive, _module_job(name, instance, metrics=metrics)) for exclusive, name, instance in jobs])
+        report_failures(http_client, scan)
+        return results
+    finally:
+        if scan_store:
+            scan_store.close()
+
+def parse_schema(args):
+    """
+    Parses the OpenAPI schema given on the command line.
+
+    :return: (full parsed schema, parsed schema dictionary passed to the modules)
+    """
+    openapi_parser = OpenAPIParser(args.input, use_cache=not args.no_schema_cache, stream=args.stream_spec)
     openapi_parsed_schema = openapi_parser.parse_openapi_schema()
     parsed_schema = {
         "full_schema": openapi_parsed_schema,
         "paths": openapi_parser.create_paths_dict(openapi_parsed_schema),
+        "endpoint_index": openapi_parser.endpoint_index,
         "api_title": openapi_parser.get_api_title(openapi_parsed_schema)
     }
+    return openapi_parsed_schema, parsed_schema
 
-    # Create HTTP client
-    http_client = HTTPClient(
+def select_modules(args, available_modules):
+    """Returns the names of the modules selected on the command line."""
+    if "all" in args.modules:
+        return available_modules.names()  # Expand 'all' to include all modules
+    return args.modules  # Run only the selected modules
+
+def create_http_client(args, limiter=None, adapter=None):
+    """Creates the HTTP client shared by all modules, optionally sharing its limits and connection pools with other clients."""
+    limiter = limiter or RequestLimiter(args.concurrency, args.host_connections)
+    return AsyncHTTPClient(
         args.url,
         headers=args.headers,
         cookies=args.cookies,
         proxies={"http": args.proxy, "https": args.proxy} if args.proxy else None,
-        verify_ssl=not args.ignore_ssl
+        verify_ssl=not args.ignore_ssl,
+        cache=ResponseCache(args.cache_size, args.cache_ttl) if args.cache else None,
+        timeout=_request_timeout(args),
+        keep_alive=not args.no_keep_alive,
+        retries=args.retries,
+        retry_backoff=args.retry_backoff,
+        deadline=time.monotonic() + args.scan_deadline if args.scan_deadline else None,
+        circuit_breaker=CircuitBreaker(args.circuit_failures, args.circuit_reset) if args.circuit_failures != 0 else None,
+        header_only_body_bytes=None if args.full_bodies else args.max_body_bytes,
+        limiter=limiter,
+        adapter=adapter or create_adapter(args, limiter.per_host_limit),
+        rate_controller=_create_rate_controller(args)
     )
 
-    results = []
+def _request_timeout(args):
+    """Returns the (connect, read) timeout of the requests. --timeout is the default of both."""
+    default = args.timeout or HTTPClient.DEFAULT_TIMEOUT
+    return args.connect_timeout or default, args.read_timeout or default
 
-    # For each module, get its optional arguments, parse them and create pass them to the object instance
-    if "all" in args.modules:
-        selected_modules = list(available_modules.keys())  # Expand 'all' to include all modules
-    else:
-        selected_modules = args.modules  # Run only the selected modules
+def create_adapter(args, per_host_limit):
+    """
+    Creates the transport adapter that holds the connections to the target: HTTP/2 connections with --http2,
+    otherwise pools of HTTP/1.1 keep-alive connections tuned with the --pool-* and --tcp-keepalive options.
+
+    :param per_host_limit: Maximum number of requests in flight to a host, the default size of its pool.
+    """
+    if args.http2:
+        from core.http2 import HTTP2Adapter
+        try:
+            return HTTP2Adapter(args.http2_connections, verify_ssl=not args.ignore_ssl, proxy=args.proxy)
+        except ImportError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    return InstrumentedHTTPAdapter(
+        pool_connections=args.pool_connections or InstrumentedHTTPAdapter.DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=args.pool_maxsize or per_host_limit,
+        pool_block=args.pool_block,
+        socket_options=tcp_keepalive_options(args.tcp_keepalive) if args.tcp_keepalive else None
+    )
 
+def create_jobs(args, module_specific_args, available_modules, selected_modules, parsed_schema, http_client, scan_store=None, scan=None):
+    """
+    Creates the module instances of the scan.
+
+    In a sharded scan, modules that declare SHARDABLE only get the paths of their shard. The other modules
+    run against the whole schema, in shard 0 only.
+
+    :return: List of (exclusive, module name, module instance) tuples, in the selected order.
+    """
+    shard_schema = parsed_schema
+    sharded = bool(args.shards and args.shards > 1)
+    if sharded:
+        shard_paths = partition_paths(parsed_schema["paths"], args.shards, args.shard_index)
+        shard_schema = dict(
+            parsed_schema, paths=shard_paths, endpoint_index=OpenAPIParser.create_endpoint_index(shard_paths)
+        )
+
+    # For each module, get its optional arguments, parse them and create pass them to the object instance
+    jobs = []
     for module_name in selected_modules:
-        module_class = available_modules.get(module_name)
+        module_class = available_modules.load(module_name) if module_name in available_modules else None
         if module_class:
-            print(f"Running {module_name} module...")
+            shardable = getattr(module_class, "SHARDABLE", False)
+            if sharded and not shardable and args.shard_index != 0:
+                continue
 
             # Get the pre-parsed module args from the dictionary object
             module_args = module_specific_args.get(module_name, argparse.Namespace())
 
             # Pass the correct args to the module
-            module_instance = module_class(http_client, parsed_schema, module_args)
-            raw_results = module_instance.run_check()
-            results.append(module_instance.format_results(raw_results))
+            # Requests sent through the module's view of the client are attributed to the module in the metrics.
+            # Modules that declare NEEDS_BODY = False only look at status codes and headers, their bodies are cut off
+            module_http_client = http_client.for_module(module_name, needs_body=getattr(module_class, "NEEDS_BODY", True))
+            module_instance = module_class(module_http_client, shard_schema if shardable else parsed_schema, module_args)
+            if scan_store:
+                module_instance.checkpoint = scan_store.checkpoint(
+                    scan["scan_id"], module_name, scan["base_scan_id"], scan["unchanged_endpoints"]
+                )
+            # Modules that declare FINGERPRINT_KEY_COLUMNS record the fingerprint of every response they get
+            if args.group_findings and hasattr(module_class, "FINGERPRINT_KEY_COLUMNS"):
+                module_instance.fingerprints = ResponseFingerprints(args.fingerprint_body)
+            exclusive = getattr(module_class, "EXCLUSIVE", False)
+            jobs.append((exclusive, module_name, module_instance))
         else:
             print(f"Module '{module_name}' not found.")
             sys.exit(1)
+    return jobs
 
 
-    # Generate report
-    generate_report(parsed_schema["api_title"], results, args.format)
+def _open_scan(args, openapi_parsed_schema, api_title, selected_modules, module_specific_args):
+    """
+    Opens the scan store and creates a new scan, or reopens the one given with --resume.
+
+    :return: (store, scan), or (None, None) if the store is disabled. The scan dictionary also holds the
+             endpoints whose results an incremental scan carries forward, as "unchanged_endpoints".
+    """
+    if args.no_store:
+        if args.resume or args.incremental:
+            print("Error: --resume and --incremental need the scan store, they can't be used with --no-store.")
+            sys.exit(1)
+        return None, None
+
+    store_path = args.store or ScanStore.default_path()
+    try:
+        scan_store = ScanStore(args.store)
+    except Exception as e:
+        print(f"Warning: Could not open the scan store '{store_path}': {e}. This scan can't be resumed.")
+        return None, None
+
+    fingerprints = OpenAPIParser.fingerprint_paths(openapi_parsed_schema)
+
+    if args.resume:
+        scan = scan_store.get_scan(args.resume)
+        if scan is None:
+            print(f"Error: Scan '{args.resume}' not found in '{store_path}'.")
+            sys.exit(1)
+        if scan["target"] != args.url:
+            print(f"Warning: Scan '{args.resume}' was started against '{scan['target']}', not '{args.url}'.")
+        scan_store.update_scan(args.resume, selected_modules)
+        print(f"Resuming scan {args.resume}")
+    else:
+        config_digest = scan_config_digest(args, openapi_parsed_schema, selected_modules, module_specific_args)
+        base_scan = _find_incremental_base(scan_store, args, config_digest) if args.incremental else None
+        scan_id = scan_store.create_scan(
+            args.url, args.input, api_title, selected_modules,
+            mode="incremental" if base_scan else "full",
+            base_scan_id=base_scan["scan_id"] if base_scan else None,
+            config_digest=config_digest
+        )
+        scan = scan_store.get_scan(scan_id)
+        print(f"Scan ID: {scan_id}")
 
+    scan_store.save_fingerprints(scan["scan_id"], fingerprints)
+
+    scan["unchanged_endpoints"] = set()
+    if scan["base_scan_id"]:
+        base_fingerprints = scan_store.load_fingerprints(scan["base_scan_id"])
+        scan["unchanged_endpoints"] = {
+            endpoint for endpoint, fingerprint in fingerprints.items() if base_fingerprints.get(endpoint) == fingerprint
+        }
+        changed_count = len(fingerprints) - len(scan["unchanged_endpoints"])
+        print(f"Incremental scan: {changed_count} of {len(fingerprints)} endpoints are new or changed since scan "
+              f"{scan['base_scan_id']}, the results of the others are carried forward.")
+    return scan_store, scan
+
+def scan_config_digest(args, openapi_parsed_schema, selected_modules, module_specific_args):
+    """
+    Returns a hash of the settings that change the results of a scan apart from the endpoints themselves: the
+    spec-wide parts of the schema (title, servers, security), the headers and cookies sent (auth included), the
+    response body settings and the selected modules with their arguments. Changed endpoints are found by their
+    own fingerprints (see OpenAPIParser.fingerprint_paths).
+    """
+    config = {
+        "spec": {key: openapi_parsed_schema.get(key) for key in ("servers", "security")},
+        "api_title": (openapi_parsed_schema.get("info") or {}).get("title"),
+        "headers": args.headers,
+        "cookies": args.cookies,
+        "bodies": None if args.full_bodies else args.max_body_bytes,
+        "modules": {name: vars(module_specific_args.get(name, argparse.Namespace())) for name in selected_modules},
+    }
+    return hashlib.sha256(OpenAPIParser.canonical_json(config).encode("utf-8")).hexdigest()
+
+def _find_incremental_base(scan_store, args, config_digest):
+    """Returns the scan an incremental scan carries results forward from, or None if a full scan is due."""
+    base_scan = scan_store.last_completed_scan(args.url, config_digest)
+    if base_scan is None:
+        print(f"No completed scan of '{args.url}' with the same schema settings, headers, cookies and module arguments "
+              "to compare against. Running a full scan.")
+        return None
+    if args.full_every and scan_store.incremental_scans_since_full(args.url, config_digest) + 1 >= args.full_every:
+        print(f"Running a full scan, as requested every {args.full_every} scans (--full-every).")
+        return None
+    return base_scan
+
+def _create_rate_controller(args):
+    """Creates the throughput controller requested on the command line, if any."""
+    if not args.adaptive_rate and not args.max_rps:
+        return None
+    return AdaptiveRateController(args.concurrency, max_rps=args.max_rps, adaptive=args.adaptive_rate)
+
+def _module_job(module_name, module_instance, row_writer=None, metrics=None, group_findings=False):
+    """
+    Wraps a module instance into a callable that runs the check and returns the formatted results.
+
+    run_check may return a list or yield rows as a generator. With a row_writer, rows are streamed to it
+    as they arrive instead of being collected in memory. With metrics, the module's wall time is recorded.
+    With group_findings, rows of the same finding on many endpoints are collapsed (not with a row_writer).
+    """
+    def job():
+        print(f"Running {module_name} module...\n", end="")  # Single write, so concurrent modules don't interleave
+        started_at = time.perf_counter()
+        raw_results = module_instance.run_check()
+
+        if row_writer is None:
+            rows = raw_results if isinstance(raw_results, list) else list(raw_results)
+            formatted_results = module_instance.format_results(_group_findings(module_instance, rows) if group_findings else rows)
+        else:
+            row_count = 0
+            for row in raw_results:
+                row_writer.write_row(module_name, row)
+                row_count += 1
+            formatted_results = module_instance.format_results([])
+            row_writer.write_module(module_name, formatted_results, row_count)
+
+        checkpoint = getattr(module_instance, "checkpoint", None)
+        if checkpoint:
+            checkpoint.flush()
+        if metrics:
+            metrics.record_module(module_name, time.perf_counter() - started_at)
+        return formatted_results
+    return job
+
+def _group_findings(module_instance, rows):
+    """
+    Collapses rows whose responses share a fingerprint into one row per finding, for modules that declare
+    FINGERPRINT_KEY_COLUMNS: the columns identifying the probe whose response a row describes.
+    """
+    key_columns = getattr(module_instance, "FINGERPRINT_KEY_COLUMNS", None)
+    if key_columns is None:
+        return rows
+    fingerprints = module_instance.fingerprints
+    return FindingClusterer.group(rows, lambda row: fingerprints.get(tuple(row[column] for column in key_columns)))
+
+def report_failures(http_client, scan=None):
+    """
+    Warns about the endpoints whose requests failed and tells how to retry them. Failed probes aren't
+    recorded in the scan store, so resuming the scan sends them again.
+
+    :return: The endpoints with failed requests, sorted.
+    """
+    failed_endpoints = sorted(http_client.failed_endpoints)
+    if failed_endpoints or http_client.deadline_passed():
+        if failed_endpoints:
+            print(f"Warning: Requests to {len(failed_endpoints)} endpoints failed, their probes are recorded as errors: "
+                  f"{', '.join(failed_endpoints[:10])}{', ...' if len(failed_endpoints) > 10 else ''}")
+        if scan:
+            print(f"Rerun with --resume {scan['scan_id']} to retry the probes that failed or weren't sent.")
+    return failed_endpoints
+
+def export_metrics(args, metrics):
+    """
+    Writes the scan metrics to the files given with --metrics-file (JSON) and --prometheus-file.
+
+    :return: The scan-wide part of the metrics (wall time, totals and bottleneck).
+    """
+    summary = metrics.summary()
+    try:
+        if args.metrics_file:
+            with open(args.metrics_file, "w", encoding="utf-8") as file:
+                json.dump(summary, file, indent=4)
+            print(f"Metrics saved to {args.metrics_file}")
+        if args.prometheus_file:
+            with open(args.prometheus_file, "w", encoding="utf-8") as file:
+                file.write(metrics.to_prometheus())
+            print(f"Prometheus metrics saved to {args.prometheus_file}")
+    except OSError as e:
+        print(f"Warning: Could not write the metrics: {e}")
+    return {key: summary[key] for key in ("wall_s", "totals", "bottleneck")}
 
 def generate_report(api_title, results, format):
-    """Generates and saves the report in the specified format."""
+    """Generates and saves the report in the specified format. Returns the name of the report file."""
     try:
         if format.upper() == "HTML":
+            from reports.html_report import HTMLReport  # Jinja2 is only needed for HTML reports
             report = HTMLReport(results)
-            report_content = report.generate()
+            with open_report_file(api_title, format) as file:
+                report.write(file)
+            return file.name
         elif format.upper() == "JSON":
-            json_tmp_report = {"modules": results}
-            report_content = json.dumps(json_tmp_report, indent=4)
+            # Serialize straight into the file instead of building the whole document in memory
+            with open_report_file(api_title, format) as file:
+                json.dump({"modules": results}, file, indent=4, default=str)
+            return file.name
         else:
             raise ValueError("No such output format")
 
-        # Use our new centralized function to save the report
-        save_report_to_file(report_content, api_title, format)
-
     except Exception as e:
         print(f"Error writing to output file: {e}")
         sys.exit(1)
 
-def save_report_to_file(content, api_title, format):
-    """Handles saving reports to files with incremental naming to avoid overwriting."""
+@contextmanager
+def open_report_file(api_title, format):
+    """Opens a new report file for streaming writes, with incremental naming to avoid overwriting."""
     api_title_formatted = api_title.replace(" ", "_")
     base_filename = f"{api_title_formatted}_hAPI_report"
     
@@ -88,18 +540,25 @@ def save_report_to_file(content, api_title, format):
         file_extension = ".html"
     elif format.upper() == "JSON":
         file_extension = ".json"
+    elif format.upper() == "JSONL":
+        file_extension = ".jsonl"
     else:
         raise ValueError("Unsupported format for saving reports")
 
     filename = base_filename + file_extension
     counter = 1
 
-    # Increment filename if file exists
-    while os.path.exists(filename):
-        filename = f"{base_filename}({counter}){file_extension}"
-        counter += 1
+    # Increment filename if file exists. Exclusive creation, so concurrent scans of APIs with the same title
+    # (batch mode) can't pick the same name
+    while True:
+        try:
+            file = open(filename, "x", encoding="utf-8")
+            break
+        except FileExistsError:
+            filename = f"{base_filename}({counter}){file_extension}"
+            counter += 1
 
-    with open(filename, "w", encoding="utf-8") as file:
-        file.write(content)
+    with file:
+        yield file
 
     print(f"Report saved to {filename}")
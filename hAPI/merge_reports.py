@@ -0,0 +1,37 @@
+import argparse
+import json
+import sys
+from core.metrics import ScanMetrics
+from core.sharding import merge_shard_results
+from hapi import generate_report
+from parsers.openapi_parser import OpenAPIParser
+
+def main():
+    """Merges the JSON reports of the shards of a scan (e.g. one per CI runner) into a single report."""
+    parser = argparse.ArgumentParser(
+        description="Merge the JSON reports of a scan run with --shards N --shard-index i into a single report"
+    )
+    parser.add_argument("-i", "--input", required=True, help="Path to the OpenAPI Spec file the shards were run with (YAML/JSON)")
+    parser.add_argument("-f", "--format", required=True, choices=["HTML", "JSON"], help="Report format")
+    parser.add_argument("reports", nargs="+", help="JSON reports of the shards")
+    args = parser.parse_args()
+
+    openapi_parser = OpenAPIParser(args.input)
+    openapi_parsed_schema = openapi_parser.parse_openapi_schema()
+
+    shard_results = []
+    for report in args.reports:
+        try:
+            with open(report, "r", encoding="utf-8") as file:
+                # The performance section only describes the runner of one shard
+                shard_results.append([result for result in json.load(file)["modules"] if result["module"] != ScanMetrics.SECTION_TITLE])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Could not read the shard report '{report}': {e}")
+            sys.exit(1)
+
+    # Shard 0 runs the modules that can't be sharded, pass its report first to keep the module order
+    results = merge_shard_results(shard_results, list(openapi_parser.create_paths_dict(openapi_parsed_schema)))
+    generate_report(openapi_parser.get_api_title(openapi_parsed_schema), results, args.format)
+
+if __name__ == "__main__":
+    main()
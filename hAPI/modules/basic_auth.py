@@ -1,9 +1,14 @@
 import random
+from core.scan_store import NullCheckpoint
+from exceptions import RequestFailedError
 
 class BasicAuth:
     DEFAULT_TEST_USERNAME = "testuser"
     DEFAULT_TEST_PASSWORD = "testpass"
 
+    # Status codes and WWW-Authenticate are all that is compared
+    NEEDS_BODY = False
+
     def __init__(self, http_client, parsed_schema, args):
         """Initialize with HTTP client and pre-parsed OpenAPI schema."""
         self.http_client = http_client
@@ -13,6 +18,7 @@ class BasicAuth:
         self.password = args.ba_password
         self.results = []
         self.warning_message = None
+        self.checkpoint = NullCheckpoint()  # Replaced by the scan's checkpoint when the scan store is enabled
 
     @classmethod
     def add_arguments(cls, parser):
@@ -29,58 +35,72 @@ class BasicAuth:
             if not self.openapi_paths:
                 print("No OpenAPI schema provided and no endpoints specified. Skipping HTTP Basic Auth check.")
                 return []
-            selected_endpoints = random.sample(self.openapi_paths, min(5, len(self.openapi_paths)))  # Pick 5 random endpoints
+            # A resumed scan keeps testing the endpoints it picked before the interruption
+            selected_endpoints = self.checkpoint.remember(
+                "endpoints", lambda: random.sample(self.openapi_paths, min(5, len(self.openapi_paths)))  # Pick 5 random endpoints
+            )
 
         for endpoint in selected_endpoints:
-            result_row = [endpoint]
-
-            # Test without authentication
-            no_auth_response = self._send_request(endpoint, auth=None)
-            no_auth_status = no_auth_response.status_code
-            www_auth_header = no_auth_response.headers.get("WWW-Authenticate", "Not Present")
-
-            # Test with test credentials
-            test_auth_response = self._send_request(endpoint, auth=(self.DEFAULT_TEST_USERNAME, self.DEFAULT_TEST_PASSWORD))
-            test_auth_status = test_auth_response.status_code
-
-            # Test with real credentials (if provided)
-            real_auth_status = None
-            if self.username and self.password:
-                real_auth_response = self._send_request(endpoint, auth=(self.username, self.password))
-                real_auth_status = real_auth_response.status_code
-
-                # Log a warning if test creds succeed but real creds fail
-                if test_auth_status < 400 and real_auth_status >= 400:
-                    self.warning_message = (
-                        "<strong>Warning: The API accepted default test credentials (testuser:testpass) but rejected the provided valid credentials. "
-                        "This may indicate weak default credentials or a misconfiguration.<strong>"
-                    )
-
-            # Determine test result
-            if no_auth_status == 405 or test_auth_status == 405 or real_auth_status == 405:
-                test_result = "Unsupported HTTP method - no results."
-            elif www_auth_header != "Not Present":
-                test_result = "Supports Basic Auth"
-            elif no_auth_status != test_auth_status:
-                test_result = "Supports Basic Auth"
-            else:
-                test_result = "No Basic Auth Detected"
-
-            result_row.extend([
-                no_auth_status, 
-                test_auth_status, 
-                real_auth_status if real_auth_status is not None else "Not Tested", 
-                www_auth_header,
-                test_result
-            ])
+            try:
+                result_row = self.checkpoint.probe(endpoint, lambda: self._test_endpoint(endpoint), endpoint=endpoint)
+            except RequestFailedError as e:
+                self.results.append([endpoint, "N/A", "N/A", "N/A", "N/A", f"ERROR: {e}"])
+                continue
+            test_auth_status, real_auth_status = result_row[2], result_row[3]
+
+            # Log a warning if test creds succeed but real creds fail
+            if real_auth_status != "Not Tested" and test_auth_status < 400 and real_auth_status >= 400:
+                self.warning_message = (
+                    "<strong>Warning: The API accepted default test credentials (testuser:testpass) but rejected the provided valid credentials. "
+                    "This may indicate weak default credentials or a misconfiguration.<strong>"
+                )
 
             self.results.append(result_row)
 
         return self.results
 
+    def _test_endpoint(self, endpoint):
+        """Sends the requests without, with test and with real credentials and returns the result row."""
+        result_row = [endpoint]
+
+        # Test without authentication
+        no_auth_response = self._send_request(endpoint, auth=None)
+        no_auth_status = no_auth_response.status_code
+        www_auth_header = no_auth_response.headers.get("WWW-Authenticate", "Not Present")
+
+        # Test with test credentials
+        test_auth_response = self._send_request(endpoint, auth=(self.DEFAULT_TEST_USERNAME, self.DEFAULT_TEST_PASSWORD))
+        test_auth_status = test_auth_response.status_code
+
+        # Test with real credentials (if provided)
+        real_auth_status = None
+        if self.username and self.password:
+            real_auth_response = self._send_request(endpoint, auth=(self.username, self.password))
+            real_auth_status = real_auth_response.status_code
+
+        # Determine test result
+        if no_auth_status == 405 or test_auth_status == 405 or real_auth_status == 405:
+            test_result = "Unsupported HTTP method - no results."
+        elif www_auth_header != "Not Present":
+            test_result = "Supports Basic Auth"
+        elif no_auth_status != test_auth_status:
+            test_result = "Supports Basic Auth"
+        else:
+            test_result = "No Basic Auth Detected"
+
+        result_row.extend([
+            no_auth_status, 
+            test_auth_status, 
+            real_auth_status if real_auth_status is not None else "Not Tested", 
+            www_auth_header,
+            test_result
+        ])
+
+        return result_row
+
     def _send_request(self, path, auth):
         """Sends a GET request with optional Basic Authentication."""
-        return self.http_client.send_request(path, "GET", auth=auth)
+        return self.http_client.send_request(path, "GET", auth=auth, use_cache=True)
 
     def format_results(self, unformatted_results):
         """Formats the results for output."""
@@ -1,4 +1,6 @@
 import random
+from core.scan_store import NullCheckpoint
+from exceptions import RequestFailedError
 
 class CommonSecurityHeaders:
     HEADERS_TO_CHECK = {
@@ -8,12 +10,15 @@ class CommonSecurityHeaders:
         "X-Powered-By": {"expected": False, "display": "X-Powered-By"}
     }
 
+    NEEDS_BODY = False
+
     def __init__(self, http_client, parsed_schema, args):
         """Initialize with HTTP client and OpenAPI schema."""
         self.http_client = http_client
         self.openapi_paths = parsed_schema["paths"]
         self.endpoints = args.csh_endpoints.split(",") if args.csh_endpoints else list(self.openapi_paths.keys())
         self.results = []
+        self.checkpoint = NullCheckpoint()  # Replaced by the scan's checkpoint when the scan store is enabled
 
     @classmethod
     def add_arguments(cls, parser):
@@ -26,35 +31,47 @@ class CommonSecurityHeaders:
             print("No available endpoints to test security headers.")
             return []
 
-        endpoint = random.choice(self.endpoints)
+        # A resumed scan keeps checking the endpoint it picked before the interruption
+        endpoint = self.checkpoint.remember("endpoint", lambda: random.choice(self.endpoints))
         try:
-            response = self._send_request(endpoint)
-            headers = response.headers
-
-            for header, details in self.HEADERS_TO_CHECK.items():
-                is_present = header in headers
-                expected = details["expected"]
-                header_value = headers.get(header, "N/A")
-                test_result = "PASS" if is_present == expected else "FAIL"
-
-                self.results.append([
-                    endpoint,
-                    details["display"],
-                    "Yes" if is_present else "No",
-                    header_value,
-                    test_result
-                ])
-
+            self.results.extend(self.checkpoint.probe(endpoint, lambda: self._check_headers(endpoint), endpoint=endpoint))
+        except RequestFailedError as e:
+            self.results.extend(
+                [endpoint, details["display"], "N/A", "N/A", f"ERROR: {e}"] for details in self.HEADERS_TO_CHECK.values()
+            )
         except Exception as e:
             print(f"Error: Failed to process endpoint '{endpoint}' due to: {e}. Skipping.")
         
         return self.results
 
+    def _check_headers(self, endpoint):
+        """Requests the endpoint and returns one result row per checked header."""
+        response = self._send_request(endpoint)
+        headers = response.headers
+
+        rows = []
+        for header, details in self.HEADERS_TO_CHECK.items():
+            is_present = header in headers
+            expected = details["expected"]
+            header_value = headers.get(header, "N/A")
+            test_result = "PASS" if is_present == expected else "FAIL"
+
+            rows.append([
+                endpoint,
+                details["display"],
+                "Yes" if is_present else "No",
+                header_value,
+                test_result
+            ])
+        return rows
+
     def _send_request(self, path):
         """Sends a GET request and returns the response object."""
         try:
-            response = self.http_client.send_request(path, "GET")
+            response = self.http_client.send_request(path, "GET", use_cache=True)
             return response
+        except RequestFailedError:
+            raise
         except Exception as e:
             print(f"Warning: Request to '{path}' failed: {e}")
             return type("FakeResponse", (), {"headers": {}})()
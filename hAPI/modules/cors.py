@@ -1,8 +1,17 @@
 import random
+from core.fingerprint import NullFingerprints
+from core.scan_store import NullCheckpoint
+from exceptions import RequestFailedError
 
 class Cors:
     TEST_ORIGINS = ["null", "https://evil.com"]
 
+    # The verdict only depends on the Access-Control-* headers
+    NEEDS_BODY = False
+
+    # Each row is the response of one endpoint to one Origin
+    FINGERPRINT_KEY_COLUMNS = (0, 1)
+
     def __init__(self, http_client, parsed_schema, args):
         """Initialize with HTTP client and pre-parsed OpenAPI schema."""
         self.http_client = http_client
@@ -10,6 +19,8 @@ class Cors:
         self.endpoints = args.cors_endpoints.split(",") if args.cors_endpoints else None
         self.custom_origin = args.cors_custom_origin
         self.results = []
+        self.checkpoint = NullCheckpoint()  # Replaced by the scan's checkpoint when the scan store is enabled
+        self.fingerprints = NullFingerprints()  # Replaced when findings are grouped (--group-findings)
         if self.custom_origin:
             self.TEST_ORIGINS.append(self.custom_origin)
 
@@ -27,41 +38,54 @@ class Cors:
             if not self.openapi_paths:
                 print("No OpenAPI schema provided and no endpoints specified. Skipping CORS check.")
                 return []
-            selected_endpoints = random.sample(self.openapi_paths, min(3, len(self.openapi_paths)))
+            # A resumed scan keeps testing the endpoints it picked before the interruption
+            selected_endpoints = self.checkpoint.remember(
+                "endpoints", lambda: random.sample(self.openapi_paths, min(3, len(self.openapi_paths)))
+            )
 
         for endpoint in selected_endpoints:
             for test_origin in self.TEST_ORIGINS:
-                response = self._send_request(endpoint, headers={"Origin": test_origin})
-                acao = response.headers.get("Access-Control-Allow-Origin", "Not Present")
-                acac = response.headers.get("Access-Control-Allow-Credentials", "Not Present")
-
-                # Security Issues
-                if acao == test_origin:
-                    if acac == "true":
-                        security_issue = "ACAO reflects Origin and ACAC: true (High Risk)"
-                    else:
-                        security_issue = "ACAO reflects Origin (Potential Risk)"
-                elif acao == "*":
-                    if acac == "true":
-                        security_issue = "ACAC: true with wildcard ACAO (Blocked by Browsers, but Bad Config)"
-                    else:
-                        security_issue = "ACAO accepts wildcard (Potential Risk)"
-                elif acao == "null":
-                    if acac == "true":
-                        security_issue = "ACAO: null and ACAC: true (High Risk)"
-                    else:
-                        security_issue = "ACAO: null (Potential Risk)"
-                else:
-                    security_issue = "No obvious misconfiguration"
-
-                # Store results
-                self.results.append([endpoint, test_origin, acao, acac, security_issue])
+                try:
+                    result_row = self.checkpoint.probe(
+                        f"{endpoint} {test_origin}", lambda: self._test_origin(endpoint, test_origin), endpoint=endpoint
+                    )
+                except RequestFailedError as e:
+                    result_row = [endpoint, test_origin, "N/A", "N/A", f"ERROR: {e}"]
+                self.results.append(result_row)
 
         return self.results
 
+    def _test_origin(self, endpoint, test_origin):
+        """Sends a request with the given Origin and returns the result row."""
+        response = self._send_request(endpoint, headers={"Origin": test_origin})
+        self.fingerprints.record((endpoint, test_origin), response)
+        acao = response.headers.get("Access-Control-Allow-Origin", "Not Present")
+        acac = response.headers.get("Access-Control-Allow-Credentials", "Not Present")
+
+        # Security Issues
+        if acao == test_origin:
+            if acac == "true":
+                security_issue = "ACAO reflects Origin and ACAC: true (High Risk)"
+            else:
+                security_issue = "ACAO reflects Origin (Potential Risk)"
+        elif acao == "*":
+            if acac == "true":
+                security_issue = "ACAC: true with wildcard ACAO (Blocked by Browsers, but Bad Config)"
+            else:
+                security_issue = "ACAO accepts wildcard (Potential Risk)"
+        elif acao == "null":
+            if acac == "true":
+                security_issue = "ACAO: null and ACAC: true (High Risk)"
+            else:
+                security_issue = "ACAO: null (Potential Risk)"
+        else:
+            security_issue = "No obvious misconfiguration"
+
+        return [endpoint, test_origin, acao, acac, security_issue]
+
     def _send_request(self, path, headers=None):
         """Sends a GET request with optional CORS headers."""
-        return self.http_client.send_request(path, "GET", headers=headers)
+        return self.http_client.send_request(path, "GET", headers=headers, use_cache=True)
 
     def format_results(self, unformatted_results):
         """Formats the results for output."""
@@ -1,6 +1,19 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.latency_analysis import analyze_latencies
+from core.scan_store import NullCheckpoint
+from exceptions import RequestFailedError
+
 class RateLimiting:
     DEFAULT_THRESHOLD = 100
 
+    # Response times are skewed by concurrent traffic, so this module runs alone
+    EXCLUSIVE = True
+
+    # Response times include the body download, so bodies are read in full
+    NEEDS_BODY = True
+
     SENSITIVE_ENDPOINTS = [
         '/auth',
         '/login',
@@ -19,20 +32,40 @@ class RateLimiting:
         "X-RateLimit-Remaining"
     ]
 
+    # A latency change point counts as throttling only if the test is this confident...
+    MIN_CHANGE_CONFIDENCE = 0.95
+    # ...and the median response time after the onset is this many times slower than before it
+    SIGNIFICANT_SLOWDOWN = 1.5
+    MINOR_SLOWDOWN = 1.2
+
+    # In rate mode, the load is sent by enough threads to keep this many seconds of requests in flight, so slow
+    # responses don't hold back the next requests...
+    LOAD_LATENCY_BUDGET = 1.0  # seconds
+    # ...but never more than this many threads, in burst mode too
+    MAX_LOAD_WORKERS = 256
+    # An achieved rate below this fraction of --rl-rps is reported as not reached
+    RATE_TOLERANCE = 0.9
+
     def __init__(self, http_client, parsed_schema, args):
         """Initialize with HTTP client and pre-parsed OpenAPI schema."""
         self.http_client = http_client
         self.openapi_schema = parsed_schema["full_schema"]
         self.openapi_paths = parsed_schema["paths"]
+        self.endpoint_index = parsed_schema["endpoint_index"]
         self.threshold = args.rl_threshold if args.rl_threshold else self.DEFAULT_THRESHOLD
         self.endpoints = args.rl_endpoints if args.rl_endpoints else None
+        self.target_rps = args.rl_rps
+        self.burst = args.rl_burst
         self.results = []
+        self.checkpoint = NullCheckpoint()  # Replaced by the scan's checkpoint when the scan store is enabled
 
     @classmethod
     def add_arguments(cls, parser):
         """Defines CLI arguments specific to this module."""
         parser.add_argument("--rl-threshold", type=int, help="Threshold for rate limiting detection.")
         parser.add_argument("--rl-endpoints", help="A comma-separated list of target endpoints.")
+        parser.add_argument("--rl-rps", type=float, help="Send the requests concurrently at this target rate (requests per second).")
+        parser.add_argument("--rl-burst", action="store_true", help="Send all requests at once (overrides --rl-rps).")
 
     def run_check(self):
         """Runs the rate limiting check across endpoints with error handling."""
@@ -58,99 +91,159 @@ class RateLimiting:
 
         for endpoint in endpoint_list:
             try:
-                result_row = [endpoint]
-                found_headers = []
-                found_status_codes = set()
-                response_times = []
-
-                for i in range(request_threshold):
-                    resp = self._send_request(endpoint)
-                    response_times.append(round(resp.elapsed.total_seconds() * 1000, 4))  # Ensure 4 decimal places
-                    
-                    for header in self.RATE_LIMIT_HEADERS:
-                        if header in resp.headers:
-                            found_headers.append((header, resp.headers[header]))
-
-                    if resp.status_code in self.SUSPICIOUS_STATUS_CODES:
-                        found_status_codes.add(resp.status_code)
-
-                batch_size = request_threshold // 3
-                batch_1_avg = round(sum(response_times[:batch_size]) / batch_size, 4)
-                batch_2_avg = round(sum(response_times[batch_size:2 * batch_size]) / batch_size, 4)
-                batch_3_avg = round(sum(response_times[2 * batch_size:]) / batch_size, 4)
-
-                heuristic_result = self.determine_heuristic_result(
-                    found_headers, found_status_codes, batch_1_avg, batch_2_avg, batch_3_avg
+                result_row = self.checkpoint.probe(
+                    endpoint, lambda: self._test_endpoint(endpoint, request_threshold), endpoint=endpoint
                 )
-
-                result_row.extend([
-                    found_headers if found_headers else None,
-                    list(found_status_codes) if found_status_codes else None,
-                    batch_1_avg,
-                    batch_2_avg,
-                    batch_3_avg,
-                    heuristic_result
-                ])
-
                 self.results.append(result_row)
 
+            except RequestFailedError as e:
+                self.results.append([endpoint] + [None] * 8 + [f"ERROR: {e}"])
             except Exception as e:
                 print(f"Error: Failed to process endpoint '{endpoint}' due to: {e}. Skipping to next.")
                 continue
 
         return self.results
 
+    def _test_endpoint(self, endpoint, request_count):
+        """Sends the load to the endpoint and returns the result row."""
+        result_row = [endpoint]
+        found_headers = []
+        found_status_codes = set()
+        first_limit_index = None
+
+        samples = self._send_load(endpoint, request_count)
+        response_times = [round((received_ns - sent_ns) / 1e6, 4) for sent_ns, received_ns, _ in samples]
+
+        for index, (_, _, resp) in enumerate(samples, start=1):
+            for header in self.RATE_LIMIT_HEADERS:
+                if header in resp.headers:
+                    found_headers.append((header, resp.headers[header]))
+
+            if resp.status_code in self.SUSPICIOUS_STATUS_CODES:
+                found_status_codes.add(resp.status_code)
+
+            if first_limit_index is None and (resp.status_code == 429 or "Retry-After" in resp.headers):
+                first_limit_index = index
+
+        analysis = analyze_latencies(response_times)
+        heuristic_result = self.determine_heuristic_result(found_headers, found_status_codes, analysis)
+        achieved_rate = self._achieved_rate(samples)
+        shortfall = self._load_shortfall(request_count, achieved_rate)
+        if shortfall:
+            print(f"Warning: Rate limiting load on '{endpoint}': {shortfall}")
+            heuristic_result = f"{heuristic_result}; <p>{shortfall}</p>"
+        percentiles = analysis["percentiles"]
+        rolling_start, rolling_end = analysis["rolling_median"]
+
+        result_row.extend([
+            found_headers if found_headers else None,
+            list(found_status_codes) if found_status_codes else None,
+            " / ".join(str(percentiles[p]) for p in sorted(percentiles)) if percentiles else None,
+            f"{rolling_start} → {rolling_end}" if rolling_start is not None else None,
+            analysis["onset_index"] if self._is_slowdown(analysis) else "Not Detected",
+            analysis["confidence"],
+            achieved_rate,
+            first_limit_index if first_limit_index is not None else "Not Observed",
+            heuristic_result
+        ])
+
+        return result_row
+
+    def _send_load(self, endpoint, request_count):
+        """
+        Sends request_count requests to the endpoint, sequentially or, in rate/burst mode, concurrently
+        over pre-warmed keep-alive connections.
+
+        :return: List of (send_ns, receive_ns, response) tuples in request order, timed with time.perf_counter_ns.
+        """
+        if not self.burst and not self.target_rps:
+            samples = []
+            for _ in range(request_count):
+                sent_ns = time.perf_counter_ns()
+                resp = self._send_request(endpoint)
+                samples.append((sent_ns, time.perf_counter_ns(), resp))
+            return samples
+
+        # The load has its own threads, its requests bypass the client's concurrency limits (see _send_request)
+        workers = self._load_workers(request_count)
+        if hasattr(self.http_client, "warm_connections"):
+            self.http_client.warm_connections(workers, endpoint)
+
+        interval_ns = 0 if self.burst else int(1e9 / self.target_rps)
+        start_ns = time.perf_counter_ns()
+
+        def timed_request(index):
+            delay_ns = start_ns + index * interval_ns - time.perf_counter_ns()
+            if delay_ns > 0:
+                time.sleep(delay_ns / 1e9)
+            sent_ns = time.perf_counter_ns()
+            resp = self._send_request(endpoint)
+            return sent_ns, time.perf_counter_ns(), resp
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hapi-rl-load") as executor:
+            return list(executor.map(timed_request, range(request_count)))
+
+    def _load_workers(self, request_count):
+        """Returns the number of threads sending the load in rate/burst mode, sized from the target rate."""
+        if self.burst:
+            workers = request_count
+        else:
+            workers = math.ceil(self.target_rps * self.LOAD_LATENCY_BUDGET)
+        return max(1, min(request_count, workers, self.MAX_LOAD_WORKERS))
+
+    def _load_shortfall(self, request_count, achieved_rate):
+        """Describes how the load fell short of the requested burst or rate, None if it was reached."""
+        if self.burst:
+            workers = self._load_workers(request_count)
+            if workers < request_count:
+                return f"At most {workers} of the {request_count} requests were sent at once (burst mode is limited to {self.MAX_LOAD_WORKERS} concurrent requests)."
+            return None
+        if self.target_rps and achieved_rate is not None and achieved_rate < self.target_rps * self.RATE_TOLERANCE:
+            return f"The target rate of {self.target_rps:g} requests per second was not reached, requests were sent at {achieved_rate:g} per second. Limits between these rates cannot be detected."
+        return None
+
+    @staticmethod
+    def _achieved_rate(samples):
+        """Returns the rate at which the requests were actually sent, in requests per second."""
+        if len(samples) < 2:
+            return None
+        send_times = [sent_ns for sent_ns, _, _ in samples]
+        duration_ns = max(send_times) - min(send_times)
+        return round((len(samples) - 1) * 1e9 / duration_ns, 2) if duration_ns else None
+
     def _send_request(self, path):
         """Sends an HTTP request and returns the response object."""
         http_verb = self._get_verbs_for_path(path)[0].upper()
-        response = self.http_client.send_request(path, http_verb)
+        # Bypass the adaptive rate controller and the concurrency limits, they would hide the target's own rate limiting
+        response = self.http_client.send_request(path, http_verb, bypass_throttle=True)
         return response
     
     def _get_verbs_for_path(self, path):
         """Returns the available HTTP verbs for a given path, handling variations like trailing slashes."""
-        
-        normalized_path = path.rstrip("/")  # Remove trailing slashes
-        available_paths = {p.rstrip("/"): p for p in self.openapi_paths.keys()}  # Normalize all schema paths
-
-        # Find a matching path
-        matched_path = available_paths.get(normalized_path)
-
-        if not matched_path:
+        if path not in self.endpoint_index:
             raise ValueError(f"Error: The provided endpoint '{path}' was not found in the OpenAPI schema. "
                             f"Did you mean '{self._suggest_similar_path(path)}'?")
 
-        verbs = self.openapi_paths[matched_path].keys()
+        verbs = self.endpoint_index.verbs(path)
         return list(verbs) if verbs else ["GET"]
     
     def _suggest_similar_path(self, user_path):
         """Suggests the closest matching path from the OpenAPI schema."""
-        
-        from difflib import get_close_matches
-
-        normalized_path = user_path.rstrip("/")
-        available_paths = [p.rstrip("/") for p in self.openapi_paths.keys()]
-        
-        close_matches = get_close_matches(normalized_path, available_paths, n=1, cutoff=0.7)
-        
-        return close_matches[0] if close_matches else "Check your OpenAPI schema for valid paths."
+        suggestion = self.endpoint_index.suggest(user_path)
+        return suggestion.rstrip("/") if suggestion else "Check your OpenAPI schema for valid paths."
 
     def _find_baseline_endpoint(self, sensitive_endpoints_list):
         """Extracts a non-senstive endpoint from the OpenAPI schema to serve as baseline for the rate limiting checks."""
-        all_paths = list(self.openapi_paths.keys())
         sensitive_endpoints_set = set(sensitive_endpoints_list)
 
-        for path in all_paths:
+        for path in self.endpoint_index.paths:
             if path not in sensitive_endpoints_set:
                 return path  # Found a suitable baseline endpoint
         return None
 
     def find_endpoints(self):
         """Cross-checks the OpenAPI schema with predefined sensitive endpoints."""
-        sensitive_found = []
-        for path in self.openapi_paths.keys():
-            if any(endpoint in path for endpoint in self.SENSITIVE_ENDPOINTS):
-                sensitive_found.append(path)
-        return sensitive_found
+        return list(self.endpoint_index.containing(self.SENSITIVE_ENDPOINTS))
 
     def _check_throttling(self, request_times):
         """Checks if there's a significant increase in response times, which could indicate throttling."""
@@ -165,7 +258,18 @@ class RateLimiting:
         
         return "No Throttling"
 
-    def determine_heuristic_result(self, found_headers, found_status_codes, batch_1_avg, batch_2_avg, batch_3_avg):
+    def _slowdown_ratio(self, analysis):
+        """Returns how many times slower the responses got after the detected change point."""
+        if not analysis["before_median"] or analysis["after_median"] is None:
+            return None
+        return analysis["after_median"] / analysis["before_median"]
+
+    def _is_slowdown(self, analysis):
+        ratio = self._slowdown_ratio(analysis)
+        return (ratio is not None and ratio >= self.MINOR_SLOWDOWN
+                and analysis["confidence"] >= self.MIN_CHANGE_CONFIDENCE)
+
+    def determine_heuristic_result(self, found_headers, found_status_codes, analysis):
         """Provides a heuristic conclusion if rate limiting is present based on headers, status codes, and response time changes."""
         
         result_messages = []
@@ -178,24 +282,33 @@ class RateLimiting:
         if found_status_codes:
             result_messages.append(f"<p>Rate limiting detected (status codes found: {', '.join(map(str, found_status_codes))}).</p>")
 
-        # Check for increasing response times
-        if batch_1_avg and batch_2_avg and batch_3_avg:
-            if batch_2_avg > batch_1_avg * 1.5 and batch_3_avg > batch_2_avg * 1.5:
-                result_messages.append("<p>Possible throttling detected (> 50% increase in response time).</p>")
-            elif batch_2_avg > batch_1_avg and batch_3_avg > batch_2_avg:
-                result_messages.append("<p>Possible throttling detected (< 50% increase in response time). Possible false positive.</p>")
+        # Check for a sustained increase in response times
+        if self._is_slowdown(analysis):
+            ratio = self._slowdown_ratio(analysis)
+            increase = round((ratio - 1) * 100)
+            if ratio >= self.SIGNIFICANT_SLOWDOWN:
+                result_messages.append(f"<p>Possible throttling detected ({increase}% increase in median response time from request #{analysis['onset_index']}).</p>")
+            else:
+                result_messages.append(f"<p>Possible throttling detected ({increase}% increase in median response time from request #{analysis['onset_index']}). Possible false positive.</p>")
 
         # 4. If no indicators found
         if not result_messages:
             return "No clear signs of rate limiting detected"
         return "; ".join(result_messages)  # Combine all findings into one string
 
+    def _load_mode_description(self):
+        if self.burst:
+            return "all at once (burst mode)"
+        if self.target_rps:
+            return f"concurrently at a target rate of {self.target_rps:g} requests per second"
+        return "sequentially, one after another"
 
     def format_results(self, unformatted_results):
         description_paragraphs = [
             "Tests whether a target REST API has any rate limiting measures.",
             "A value of None for the columns <strong>Rate Limit Headers Present</strong> or <strong>Rate Limit Response Status Codes</strong> indicates that no such headers were returned by the API.",
-            f"The number of requests - {self.threshold} - has been split into 3 batches. If you notice a significant increase (> 50%) in response time between batches, this is a good sign that the API has request throttling enabled."
+            f"The response times of all {self.threshold} requests are analyzed as one series. <strong>Throttling Onset</strong> is the request from which responses became consistently slower, found with a rank-based change-point test (Pettitt). <strong>Change-Point Confidence</strong> is the confidence of that test; a significant (> 50%) slowdown with a high confidence is a good sign that the API has request throttling enabled.",
+            f"Requests were sent {self._load_mode_description()}. <strong>Achieved Rate</strong> is the rate at which hAPI actually sent the requests. Limits above this rate cannot be detected; use --rl-rps or --rl-burst to send faster."
         ]
         references = [
             {"OWASP: API Security":"https://owasp.org/API-Security/editions/2023/en/0xa4-unrestricted-resource-consumption/"},
@@ -223,9 +336,12 @@ for i in {1..150}; do curl -k -o /dev/null -s -w "Request $i: HTTP Status: %{htt
                     "Endpoint", 
                     "Rate Limit Headers Present", 
                     "Rate Limit Response Status Codes", 
-                    "Batch 1 Avg Response Time (ms)", 
-                    "Batch 2 Avg Response Time (ms)", 
-                    "Batch 3 Avg Response Time (ms)", 
+                    "p50 / p90 / p99 Response Time (ms)",
+                    "Rolling Median Response Time, First → Last Window (ms)",
+                    "Throttling Onset (request #)",
+                    "Change-Point Confidence",
+                    "Achieved Rate (req/s)",
+                    "First 429/Retry-After (request #)",
                     "Heuristic Test Result"
                 ],
                 "rows": unformatted_results,
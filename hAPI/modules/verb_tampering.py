@@ -1,10 +1,44 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from core.fingerprint import NullFingerprints
+from core.raw_http import RawHTTPProber
+from core.scan_store import NullCheckpoint
+from exceptions import RequestFailedError
 
 class VerbTampering:
     """Performs HTTP verb tampering checks against an OpenAPI-defined API."""
 
     UNSUPPORTED_VERB_STATUS_CODE = "405"
 
+    DEFAULT_WORKERS = 10
+
+    # Requests pipelined per connection with --vt-raw
+    DEFAULT_PIPELINE_DEPTH = 8
+
+    # Paths sampled per router prefix in adaptive mode
+    DEFAULT_SAMPLE_SIZE = 5
+
+    # Number of leading path segments that make up a router prefix in adaptive mode
+    ROUTER_PREFIX_SEGMENTS = 2
+
+    # Sampled paths a verb must get the same response on before it is inferred for the others
+    MIN_OBSERVATIONS = 2
+
+    # Headers left out of response fingerprints, as their values or presence change between responses
+    VOLATILE_HEADERS = {
+        "date", "age", "expires", "etag", "last-modified", "content-length", "transfer-encoding", "connection",
+        "keep-alive", "set-cookie", "x-request-id", "x-correlation-id", "x-amzn-requestid", "traceparent",
+    }
+
+    # Every path is tested on its own, so sharded scans split the paths between the shards
+    SHARDABLE = True
+
+    # Only the status code is compared, so bodies are cut off
+    NEEDS_BODY = False
+
+    # A row describes the response to one verb on one path
+    FINGERPRINT_KEY_COLUMNS = (0, 1)
+
     DEFAULT_VERB_WORDLIST = [
         "OPTIONS", "GET", "HEAD", "POST", "PUT", "DELETE", "TRACE", "TRACK", "DEBUG", "PURGE",
         "CONNECT", "PROPFIND", "PROPPATCH", "MKCOL", "COPY", "MOVE", "LOCK", "UNLOCK", "PATCH",
@@ -16,46 +50,221 @@ class VerbTampering:
         self.http_client = http_client
         self.openapi_schema = parsed_schema["full_schema"]
         self.openapi_paths = parsed_schema["paths"]
+        self.endpoint_index = parsed_schema["endpoint_index"]
         self.http_verb_wordlist = self._load_wordlist(args.vt_wordlist)
-        self.results = []
+        self.workers = args.vt_workers if args.vt_workers else self.DEFAULT_WORKERS
+        self.raw_prober = self._create_raw_prober(args) if args.vt_raw else None
+        self.adaptive = args.vt_adaptive
+        self.sample_size = max(1, args.vt_sample_size or self.DEFAULT_SAMPLE_SIZE)
+        self.checkpoint = NullCheckpoint()  # Replaced by the scan's checkpoint when the scan store is enabled
+        self.fingerprints = NullFingerprints()  # Replaced when findings are grouped (--group-findings)
 
     @classmethod
     def add_arguments(cls, parser):
         """Defines CLI arguments specific to this module."""
         parser.add_argument("--vt-wordlist", help="Path to a custom wordlist for HTTP verbs for the verb tampering module.")
+        parser.add_argument("--vt-workers", type=int, help=f"Number of parallel workers for the verb tampering module (default: {cls.DEFAULT_WORKERS}).")
+        parser.add_argument("--vt-raw", action="store_true", help="Send the probes with a lean HTTP/1.1 client that pipelines requests on keep-alive connections (one per worker) and only reads status lines.")
+        parser.add_argument("--vt-pipeline-depth", type=int, help=f"Requests pipelined per connection with --vt-raw (default: {cls.DEFAULT_PIPELINE_DEPTH}, 1 disables pipelining).")
+        parser.add_argument("--vt-adaptive", action="store_true", help="Learn each verb's response to paths that don't support it from a sample of the paths per router prefix and infer it for the others, after one confirmation probe per path.")
+        parser.add_argument("--vt-sample-size", type=int, help=f"Paths per router prefix probed with every verb with --vt-adaptive (default: {cls.DEFAULT_SAMPLE_SIZE}).")
 
-    def run_check(self):
-        for path, details in self.openapi_paths.items():
-            verbs_defined_in_openapi = list(details.keys())  # Extract available verbs
+    def _create_raw_prober(self, args):
+        """Returns the raw prober, or None if the client's settings need the requests path."""
+        reason = RawHTTPProber.unsupported_reason(self.http_client)
+        if reason:
+            print(f"Warning: --vt-raw is ignored because {reason}.")
+            return None
+        return RawHTTPProber(self.http_client, args.vt_pipeline_depth or self.DEFAULT_PIPELINE_DEPTH, self.workers)
 
+    def run_check(self):
+        """
+        Sends every verb in the wordlist to every path, using a pool of workers.
+        Yields the result rows in path/verb order as they complete, so they can be streamed to the report.
+        """
+        matrix = []
+        for path in self.endpoint_index.paths:
             for verb in self.http_verb_wordlist:
-                result_row = [path, verb]
-
                 # Determine expected response codes
-                if verb.lower() in verbs_defined_in_openapi:
-                    expected_response_status_codes = [
-                        str(code) for code in details[verb.lower()]["responses"].keys()
-                    ]
-                else:
+                expected_response_status_codes = self.endpoint_index.expected_status_codes(path, verb)
+                if expected_response_status_codes is None:
                     expected_response_status_codes = [self.UNSUPPORTED_VERB_STATUS_CODE]
 
-                result_row.append(", ".join(expected_response_status_codes))
+                matrix.append((path, verb, expected_response_status_codes))
+
+        if self.adaptive:
+            yield from self._run_adaptive(matrix)
+            return
+
+        if self.raw_prober:
+            results = self._probe_raw([(path, verb) for path, verb, _ in matrix])
+            for path, verb, expected_response_status_codes in matrix:
+                yield self._result_row(path, verb, expected_response_status_codes, results[(path, verb)][0])
+            return
+
+        # executor.map yields results in submission order, so rows keep the path/verb order
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = executor.map(lambda cell: self._probe(cell[0], cell[1]), matrix)
+
+            for (path, verb, expected_response_status_codes), (response_status_code, _) in zip(matrix, results):
+                yield self._result_row(path, verb, expected_response_status_codes, response_status_code)
+
+    def _run_adaptive(self, matrix):
+        """
+        Probes a sample of the paths of each router prefix with every verb and learns the response of each verb
+        the sampled paths don't document. The other paths of the prefix are probed with the verbs they document,
+        the verbs whose response wasn't learned and one confirmation verb. If the confirmation gets the learned
+        response, the remaining verbs are inferred to get it as well, otherwise they are probed too.
+        """
+        groups = {}
+        for path in self.endpoint_index.paths:
+            groups.setdefault(self._router_prefix(path), []).append(path)
+
+        sampled = [path for paths in groups.values() for path in self._sample(paths)]
+        results = self._probe_cells([(path, verb) for path in sampled for verb in self.http_verb_wordlist])
+        sampled = set(sampled)
+
+        # The verbs of each remaining path that may be inferred, the first of them being the confirmation. Verbs
+        # that were rejected on the sampled paths go first, a path that handles them differently stands out
+        inferable = {}
+        learned = {}
+        for prefix, paths in groups.items():
+            learned[prefix] = self._learn_unsupported([path for path in paths if path in sampled], results)
+            for path in paths:
+                if path not in sampled:
+                    verbs = [verb for verb in self.http_verb_wordlist if verb in learned[prefix]
+                             and self.endpoint_index.expected_status_codes(path, verb) is None]
+                    inferable[path] = sorted(verbs, key=lambda verb: learned[prefix][verb][0] < 400)
 
-                # Send request and store response
-                response_status_code = self._send_request(path, verb)
-                result_row.append(str(response_status_code))
+        results.update(self._probe_cells([
+            (path, verb) for path, verbs in inferable.items() for verb in self.http_verb_wordlist if verb not in verbs[1:]
+        ]))
+
+        deviating = []
+        for path, verbs in inferable.items():
+            if verbs and not self._matches(results[(path, verbs[0])], learned[self._router_prefix(path)][verbs[0]]):
+                deviating.append(path)
+        results.update(self._probe_cells([(path, verb) for path in deviating for verb in self.http_verb_wordlist if (path, verb) not in results]))
+
+        for path, verb, expected_response_status_codes in matrix:
+            if (path, verb) in results:
+                yield self._result_row(path, verb, expected_response_status_codes, results[(path, verb)][0])
+            else:
+                status_code = learned[self._router_prefix(path)][verb][0]
+                yield [path, verb, ", ".join(expected_response_status_codes), f"{status_code} (inferred)",
+                       self._compare_results(status_code, expected_response_status_codes)]
+
+    def _router_prefix(self, path):
+        """Returns the leading static segments of the path, which usually select the router that handles it."""
+        segments = []
+        for segment in path.strip("/").split("/")[:self.ROUTER_PREFIX_SEGMENTS]:
+            if "{" in segment:
+                break
+            segments.append(segment)
+        return "/" + "/".join(segments)
+
+    def _sample(self, paths):
+        """Returns sample_size paths spread evenly over the list, or all of them if the list isn't longer."""
+        if len(paths) <= self.sample_size:
+            return paths
+        return [paths[index * len(paths) // self.sample_size] for index in range(self.sample_size)]
+
+    def _learn_unsupported(self, sampled_paths, results):
+        """
+        Returns the fingerprint of each verb that got the same response on every sampled path that doesn't
+        document it, as {verb: (status code, header names)}. Verbs seen on too few paths aren't learned.
+        """
+        fingerprints = {}
+        for path in sampled_paths:
+            for verb in self.http_verb_wordlist:
+                if self.endpoint_index.expected_status_codes(path, verb) is None:
+                    fingerprints.setdefault(verb, []).append(results[(path, verb)])
+
+        learned = {}
+        for verb, observed in fingerprints.items():
+            status_codes = {status_code for status_code, _ in observed}
+            header_sets = {header_names for _, header_names in observed if header_names is not None}
+            if len(observed) < self.MIN_OBSERVATIONS or len(status_codes) != 1 or len(header_sets) > 1:
+                continue
+            status_code = status_codes.pop()
+            if not isinstance(status_code, RequestFailedError):
+                learned[verb] = (status_code, header_sets.pop() if header_sets else None)
+        return learned
+
+    @staticmethod
+    def _matches(fingerprint, learned):
+        """Probes resumed from the checkpoint have no header names, only their status code is compared."""
+        status_code, header_names = fingerprint
+        if status_code != learned[0]:
+            return False
+        return header_names is None or learned[1] is None or header_names == learned[1]
+
+    def _header_names(self, headers):
+        """Returns the sorted names of the headers, without those that change from response to response."""
+        return tuple(sorted({name.lower() for name in headers} - self.VOLATILE_HEADERS))
+
+    def _result_row(self, path, verb, expected_response_status_codes, response_status_code):
+        if isinstance(response_status_code, RequestFailedError):
+            return [path, verb, ", ".join(expected_response_status_codes), "ERROR", f"ERROR: {response_status_code}"]
+
+        result_row = [path, verb, ", ".join(expected_response_status_codes), str(response_status_code)]
+
+        # Compare expected vs actual
+        result_row.append(self._compare_results(response_status_code, expected_response_status_codes))
+
+        return result_row
+
+    def _probe_cells(self, cells):
+        """Probes the (path, verb) cells with the raw prober or the pool of workers, see _probe."""
+        if self.raw_prober:
+            return self._probe_raw(cells)
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            return dict(zip(cells, executor.map(lambda cell: self._probe(cell[0], cell[1]), cells)))
+
+    def _probe_raw(self, cells):
+        """
+        Sends the probes that the checkpoint has no result for with the raw prober and returns the results of all
+        (path, verb) cells, as _probe does. Each result is recorded in the checkpoint as soon as it arrives.
+        """
+        results = {}
+        pending = []
+        for path, verb in cells:
+            if self.checkpoint.has_result(f"{verb} {path}"):
+                results[(path, verb)] = self._probe(path, verb)
+            else:
+                pending.append((path, verb))
+
+        def record(path, verb, response):
+            if isinstance(response, RequestFailedError):
+                results[(path, verb)] = (response, None)
+            else:
+                self.fingerprints.record((path, verb), response)
+                status_code = self.checkpoint.probe(f"{verb} {path}", lambda: response.status_code, endpoint=path)
+                results[(path, verb)] = (status_code, self._header_names(response.headers))
 
-                # Compare expected vs actual
-                result_row.append(self._compare_results(response_status_code, expected_response_status_codes))
+        self.raw_prober.probe(pending, record)
+        return results
 
-                self.results.append(result_row)
+    def _probe(self, path, verb):
+        """
+        Returns the status code of the verb on the path and the names of the response headers (see _header_names).
+        The status code comes from the checkpoint if an earlier run already sent the probe, the header names are
+        None then. If the request failed, the status code is the RequestFailedError. Failed probes aren't recorded,
+        a resumed scan retries them.
+        """
+        response_headers = {}
 
-        return self.results
+        def send_request():
+            response = self.http_client.send_request(path, verb)
+            response_headers["names"] = self._header_names(response.headers)
+            self.fingerprints.record((path, verb), response)
+            return response.status_code
 
-    def _send_request(self, path, verb):
-        """Sends an HTTP request with the specified verb and returns the response status code."""
-        response = self.http_client.send_request(path, verb)
-        return response.status_code
+        try:
+            status_code = self.checkpoint.probe(f"{verb} {path}", send_request, endpoint=path)
+        except RequestFailedError as e:
+            return e, None
+        return status_code, response_headers.get("names")
 
     def _compare_results(self, actual_status_code, expected_status_codes):
         """Compares actual vs expected response codes."""
@@ -88,6 +297,12 @@ class VerbTampering:
             the API responded with a code that is not defined in your OpenAPI spec. This could be due to an error, malformed request 
             or even imprefect OpenAPI documentation.'''
             ]
+        if self.adaptive:
+            description_paragraphs.append(
+                '''This scan was adaptive: a sample of the paths of each router prefix was probed with every verb. On the other paths,
+                verbs they don't document and that got the same response on all sampled paths were only probed if a confirmation
+                probe with one of them got a different response. Response codes marked "(inferred)" were not sent.'''
+            )
         references = [
             {"OWASP API Security Top 10": "https://owasp.org/www-project-api-security/"},
             {"HTTP Methods Explained": "https://developer.mozilla.org/en-US/docs/Web/HTTP/Methods"}
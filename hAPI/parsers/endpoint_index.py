@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from difflib import get_close_matches
+from types import MappingProxyType
+
+# Keys of an OpenAPI path item that describe operations (QUERY since OpenAPI 3.2)
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace", "query")
+
+# Path item fields that aren't operations. Other keys (except x- extensions) are taken as operations of
+# non-standard methods, as some specs document e.g. PROPFIND next to the standard ones
+PATH_ITEM_FIELDS = ("$ref", "summary", "description", "servers", "parameters", "additionaloperations")
+
+def is_operation_key(key):
+    """Returns True if a key of a path item names an operation."""
+    key = key.lower()
+    return key in HTTP_METHODS or not (key in PATH_ITEM_FIELDS or key.startswith("x-"))
+
+class EndpointIndex:
+    """
+    Immutable lookup index over the 'paths' section of an OpenAPI schema.
+
+    Built once per schema, so modules can resolve paths, verbs and expected status codes without rescanning
+    the raw schema dictionary.
+    """
+
+    def __init__(self, openapi_paths):
+        """
+        :param openapi_paths: The 'paths' dictionary of the OpenAPI schema.
+        """
+        operations = {}
+        normalized = {}
+        for path, path_item in openapi_paths.items():
+            verbs = {}
+            for verb, operation in (path_item or {}).items():
+                if not is_operation_key(verb) or not isinstance(operation, dict):
+                    continue
+                responses = operation.get("responses", {}) if isinstance(operation, dict) else {}
+                verbs[verb.lower()] = tuple(str(code) for code in (responses or {}))
+            operations[path] = MappingProxyType(verbs)
+            normalized.setdefault(self.normalize(path), path)
+
+        self._operations = MappingProxyType(operations)
+        self._normalized = MappingProxyType(normalized)
+        self._sorted_normalized = tuple(sorted(normalized))
+        self._paths = tuple(operations)
+
+    @staticmethod
+    def normalize(path):
+        """Normalizes a path for lookups (trailing slashes are ignored)."""
+        return path.rstrip("/")
+
+    @property
+    def paths(self):
+        """All paths, in schema order."""
+        return self._paths
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __contains__(self, path):
+        return self.resolve(path) is not None
+
+    def resolve(self, path):
+        """Returns the path as written in the schema, or None if the schema does not define it."""
+        if path in self._operations:
+            return path
+        return self._normalized.get(self.normalize(path))
+
+    def verbs(self, path):
+        """Returns the HTTP verbs (lowercase) defined for the path, in schema order. Empty if the path is unknown."""
+        resolved = self.resolve(path)
+        return tuple(self._operations[resolved]) if resolved is not None else ()
+
+    def operations(self, path):
+        """Returns a read-only {verb: expected status codes} mapping for the path, or None if the path is unknown."""
+        resolved = self.resolve(path)
+        return self._operations[resolved] if resolved is not None else None
+
+    def expected_status_codes(self, path, verb):
+        """Returns the status codes (as strings) documented for the path and verb, or None if the verb is not defined."""
+        operations = self.operations(path)
+        if operations is None:
+            return None
+        return operations.get(verb.lower())
+
+    def with_prefix(self, prefix):
+        """Returns the paths (as written in the schema) whose normalized form starts with the given prefix."""
+        prefix = self.normalize(prefix)
+        start = bisect_left(self._sorted_normalized, prefix)
+        matches = []
+        for normalized_path in self._sorted_normalized[start:]:
+            if not normalized_path.startswith(prefix):
+                break
+            matches.append(self._normalized[normalized_path])
+        return tuple(matches)
+
+    def containing(self, fragments):
+        """Returns the paths that contain any of the given fragments (e.g. sensitive endpoints such as '/login')."""
+        return tuple(path for path in self._paths if any(fragment in path for fragment in fragments))
+
+    def suggest(self, path, cutoff=0.7):
+        """Returns the closest matching schema path for a path that is not in the schema, or None."""
+        close_matches = get_close_matches(self.normalize(path), self._sorted_normalized, n=1, cutoff=cutoff)
+        return self._normalized[close_matches[0]] if close_matches else None
@@ -1,54 +1,210 @@
+import hashlib
 import json
 import os
-import yaml
+from core.user_dirs import ensure_dir, user_cache_dir
 from exceptions import OpenAPISchemaError
+from parsers.endpoint_index import EndpointIndex, is_operation_key
 
 class OpenAPIParser:
     """Parses OpenAPI schemas in JSON or YAML format"""
 
-    def __init__(self, schema_file):
+    # Bump when the cached data format changes, so stale caches are ignored
+    SCHEMA_CACHE_VERSION = 2
+
+    def __init__(self, schema_file, use_cache=True, stream=False):
+        """
+        :param schema_file: Path to the OpenAPI schema file.
+        :param use_cache: Keep the parsed schema in the per-user cache directory, keyed by the file's content hash.
+        :param stream: Parse JSON schemas incrementally and keep only the skeleton hAPI needs (see parse_openapi_skeleton).
+        """
         self.schema_file = schema_file
+        self.use_cache = use_cache
+        self.stream = stream
+        self.endpoint_index = None
 
     def parse_openapi_schema(self):
         """
         Parses an OpenAPI schema file (JSON or YAML) and returns a dictionary.
+        Also builds the endpoint index of the schema, available as self.endpoint_index.
         """
         _, file_extension = os.path.splitext(self.schema_file)
+        if self.stream:
+            if file_extension.lower() == '.json':
+                parsed_openapi_schema = self.parse_openapi_skeleton()
+                self.endpoint_index = self.create_endpoint_index(parsed_openapi_schema["paths"])
+                return parsed_openapi_schema
+            print("Warning: Streaming ingestion only supports JSON schemas. Parsing the whole schema instead.")
+
         if file_extension.lower() == '.json':
-            return self._parse_openapi_schema_from_json()
+            parse = self._parse_openapi_schema_from_json
         elif file_extension.lower() in ['.yml', '.yaml']:
-            return self._parse_openapi_schema_from_yaml()
+            parse = self._parse_openapi_schema_from_yaml
         else:
             raise OpenAPISchemaError("Unsupported file format. Only JSON or YAML files are accepted.")
 
-    def _parse_openapi_schema_from_json(self):
+        content = self._read_schema_file()
+        digest = hashlib.sha256(content).hexdigest()
+        parsed_openapi_schema = self._load_cached_schema(digest) if self.use_cache else None
+        if parsed_openapi_schema is None:
+            parsed_openapi_schema = parse(content)
+            if self.use_cache:
+                self._store_cached_schema(digest, parsed_openapi_schema)
+
+        if isinstance(parsed_openapi_schema, dict) and isinstance(parsed_openapi_schema.get("paths"), dict):
+            self.endpoint_index = self.create_endpoint_index(parsed_openapi_schema["paths"])
+        return parsed_openapi_schema
+
+    def parse_openapi_skeleton(self):
         """
-        Reads an OpenAPI JSON file and returns a dictionary.
+        Incrementally parses an OpenAPI JSON file and returns only its skeleton:
+        {"info": {"title": ...}, "paths": {path: {verb: {"responses": {code: {}}}}}}.
+
+        Everything else (components, schemas, descriptions, examples...) is skipped while reading, so peak memory
+        depends on the number of operations, not on the size of the file.
         """
         try:
-            with open(self.schema_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
+            import ijson
+        except ImportError:
+            raise OpenAPISchemaError("Streaming ingestion requires the 'ijson' package (pip install ijson).")
+
+        skeleton = {"info": {}, "paths": {}}
+        paths = skeleton["paths"]
+        keys = []  # Keys leading to the current position, "item" for array elements
+
+        try:
+            with open(self.schema_file, "rb") as f:
+                for event, value in ijson.basic_parse(f, use_float=True):
+                    if event == "map_key":
+                        keys[-1] = value
+                        continue
+                    if event in ("end_map", "end_array"):
+                        keys.pop()
+                        continue
+
+                    depth = len(keys)
+                    if depth and keys[0] == "paths" and 2 <= depth <= 5:
+                        if depth == 2 and event == "start_map":
+                            paths[keys[1]] = {}
+                        elif depth == 3 and event == "start_map" and is_operation_key(keys[2]):
+                            paths[keys[1]][keys[2]] = {"responses": {}}
+                        elif depth == 5 and keys[3] == "responses" and keys[2] in paths[keys[1]]:
+                            paths[keys[1]][keys[2]]["responses"][keys[4]] = {}
+                    elif depth == 2 and keys[0] == "info" and keys[1] == "title":
+                        skeleton["info"]["title"] = value
+
+                    if event == "start_map":
+                        keys.append(None)
+                    elif event == "start_array":
+                        keys.append("item")
+        except FileNotFoundError:
+            raise OpenAPISchemaError(f"File not found: {self.schema_file}")
+        except ijson.JSONError as e:
             raise OpenAPISchemaError(f"Invalid JSON format: {e}")
-        except FileNotFoundError as e:
+        except Exception as e:
+            raise OpenAPISchemaError(f"An error occurred while parsing JSON: {e}")
+
+        if not skeleton["info"]:
+            del skeleton["info"]
+        return skeleton
+
+    def _read_schema_file(self):
+        """
+        Reads the raw bytes of the schema file.
+        """
+        try:
+            with open(self.schema_file, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
             raise OpenAPISchemaError(f"File not found: {self.schema_file}")
+        except OSError as e:
+            raise OpenAPISchemaError(f"An error occurred while reading the schema file: {e}")
+
+    def _parse_openapi_schema_from_json(self, content):
+        """
+        Parses the content of an OpenAPI JSON file and returns a dictionary.
+        """
+        try:
+            try:
+                import orjson  # Use the fast parser when it is available
+            except ImportError:
+                return json.loads(content.decode("utf-8"))
+            return orjson.loads(content)
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError is a subclass
+            raise OpenAPISchemaError(f"Invalid JSON format: {e}")
         except Exception as e:
             raise OpenAPISchemaError(f"An error occurred while parsing JSON: {e}")
         
-    def _parse_openapi_schema_from_yaml(self):
+    def _parse_openapi_schema_from_yaml(self, content):
         """
-        Reads an OpenAPI YAML file and returns a dictionary.
+        Parses the content of an OpenAPI YAML file and returns a dictionary.
         """
+        import yaml  # Only needed for YAML schemas
         try:
-            with open(self.schema_file, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+            # Use the C loader when PyYAML was built with libyaml
+            return yaml.load(content.decode("utf-8"), Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
         except yaml.YAMLError as e:
             raise OpenAPISchemaError(f"Invalid YAML format: {e}")
-        except FileNotFoundError as e:
-            raise OpenAPISchemaError(f"File not found: {self.schema_file}")
         except Exception as e:
             raise OpenAPISchemaError(f"An error occurred while parsing YAML: {e}")
-    
+
+    @classmethod
+    def _cache_file(cls, digest):
+        """
+        Returns the path of the parsed-schema cache of a schema with the given content hash, in the per-user
+        cache directory. The file is msgpack if the package is installed, JSON otherwise.
+        """
+        try:
+            import msgpack  # noqa: F401 (faster to load than JSON)
+            extension = "msgpack"
+        except ImportError:
+            extension = "json"
+        return os.path.join(user_cache_dir(), "schemas", f"{digest}.v{cls.SCHEMA_CACHE_VERSION}.{extension}")
+
+    def _load_cached_schema(self, digest):
+        """
+        Returns the cached parsed schema if there is a cache for the schema's content hash, otherwise None.
+        Only the file named after the hash is read, and it only holds data (msgpack or JSON), never code.
+        """
+        cache_file = self._cache_file(digest)
+        try:
+            with open(cache_file, "rb") as f:
+                content = f.read()
+            if cache_file.endswith(".msgpack"):
+                import msgpack
+                cached = msgpack.unpackb(content, strict_map_key=False)
+            else:
+                cached = json.loads(content.decode("utf-8"))
+        except Exception:
+            return None  # Missing, unreadable or corrupt cache, parse the schema instead
+
+        if not isinstance(cached, dict) or cached.get("digest") != digest:
+            return None
+        return cached.get("schema")
+
+    def _store_cached_schema(self, digest, parsed_openapi_schema):
+        """
+        Writes the parsed schema to the cache. Failures (e.g. a read-only home directory, or values such as
+        YAML dates that msgpack and JSON can't hold as they are) are ignored.
+        """
+        cache_file = self._cache_file(digest)
+        temporary_file = f"{cache_file}.{os.getpid()}.tmp"
+        cached = {"digest": digest, "schema": parsed_openapi_schema}
+        try:
+            ensure_dir(os.path.dirname(cache_file))
+            if cache_file.endswith(".msgpack"):
+                import msgpack
+                content = msgpack.packb(cached)
+            else:
+                content = json.dumps(cached, separators=(",", ":")).encode("utf-8")
+            with open(temporary_file, "wb") as f:
+                f.write(content)
+            os.replace(temporary_file, cache_file)  # Atomic, so concurrent runs never read a partial cache
+        except Exception:
+            try:
+                os.remove(temporary_file)
+            except OSError:
+                pass
+
     @staticmethod
     def get_api_title(parsed_openapi_schema):
         """
@@ -68,6 +224,62 @@ class OpenAPIParser:
             raise OpenAPISchemaError("The OpenAPI schema does not contain a 'paths' object.")
         return parsed_openapi_schema['paths']
     
+    @staticmethod
+    def create_endpoint_index(openapi_paths):
+        """
+        Builds an immutable EndpointIndex over the 'paths' section for O(1) path, verb and status code lookups.
+        """
+        return EndpointIndex(openapi_paths)
+
+    @staticmethod
+    def fingerprint_paths(parsed_openapi_schema):
+        """
+        Hashes every path item (verbs, parameters, responses, ...) together with the components it references,
+        so that endpoints whose definition changed can be told apart from unchanged ones between scans.
+        Returns a dictionary of path -> SHA-256 hex digest.
+        """
+        fingerprints = {}
+        for path, path_item in OpenAPIParser.create_paths_dict(parsed_openapi_schema).items():
+            references = {}
+            OpenAPIParser._collect_references(path_item, parsed_openapi_schema, references)
+            canonical = OpenAPIParser.canonical_json({"path_item": path_item, "references": references})
+            fingerprints[path] = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return fingerprints
+
+    @staticmethod
+    def canonical_json(node):
+        """
+        Serializes node to JSON with sorted keys, for hashing. Keys are converted to strings first, since YAML
+        mappings may mix them, e.g. response codes like 200 next to 'default'.
+        """
+        return json.dumps(OpenAPIParser._string_keys(node), sort_keys=True, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def _string_keys(node):
+        if isinstance(node, dict):
+            return {str(key): OpenAPIParser._string_keys(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [OpenAPIParser._string_keys(value) for value in node]
+        return node
+
+    @staticmethod
+    def _collect_references(node, parsed_openapi_schema, references):
+        """Adds every local $ref reachable from node to references, as ref -> referenced object."""
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/") and ref not in references:
+                target = parsed_openapi_schema
+                for part in ref[2:].split("/"):
+                    part = part.replace("~1", "/").replace("~0", "~")
+                    target = target.get(part) if isinstance(target, dict) else None
+                references[ref] = target
+                OpenAPIParser._collect_references(target, parsed_openapi_schema, references)
+            for value in node.values():
+                OpenAPIParser._collect_references(value, parsed_openapi_schema, references)
+        elif isinstance(node, list):
+            for value in node:
+                OpenAPIParser._collect_references(value, parsed_openapi_schema, references)
+
     @staticmethod
     def get_path_names(openapi_paths):
         """
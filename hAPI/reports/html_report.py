@@ -1,14 +1,42 @@
 import os
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from reports.base_report import BaseReport
 
 class HTMLReport(BaseReport):
     """Generates an HTML report containing the results from all modules chosen by the user."""
 
+    # Tables with more rows than this are collapsed and paginated in the browser
+    LARGE_TABLE_ROWS = 500
+    PAGE_SIZE = 100
+
     def __init__(self, results):
         super().__init__(results)
-        self.env = Environment(loader=FileSystemLoader(os.path.dirname(__file__) + "/../templates"))
+        # Compiled templates are cached in a per-user temporary directory and invalidated when the template changes
+        self.env = Environment(
+            loader=FileSystemLoader(os.path.dirname(__file__) + "/../templates"),
+            bytecode_cache=FileSystemBytecodeCache()
+        )
+        # Large tables are embedded once as compact JSON
+        self.env.policies["json.dumps_kwargs"] = {"separators": (",", ":"), "default": str}
+
+    def _template_context(self):
+        large_tables = {}
+        for index, module in enumerate(self.results):
+            rows = module.get("table", {}).get("rows") or []
+            if len(rows) > self.LARGE_TABLE_ROWS:
+                large_tables[index] = {
+                    "rows": len(rows),
+                    "pass": sum(1 for row in rows if "PASS" in row),
+                    "fail": sum(1 for row in rows if "FAIL" in row),
+                }
+        return {"modules": self.results, "large_tables": large_tables, "page_size": self.PAGE_SIZE}
 
     def generate(self):
         template = self.env.get_template("base_template.html")
-        return template.render(modules=self.results)
\ No newline at end of file
+        return template.render(**self._template_context())
+
+    def write(self, file):
+        """Renders the report straight into a text file object, chunk by chunk."""
+        template = self.env.get_template("base_template.html")
+        for chunk in template.generate(**self._template_context()):
+            file.write(chunk)
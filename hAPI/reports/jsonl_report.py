@@ -0,0 +1,40 @@
+import json
+import threading
+
+class JSONLReportWriter:
+    """
+    Streams results to a JSON Lines file while the scan is running.
+
+    Every result row is written (and flushed) as soon as a module produces it, so memory stays flat and the
+    rows are already on disk if the scan dies. Line types:
+
+    - {"type": "scan", ...}: written first, describes the scan.
+    - {"type": "row", "module": <module>, "row": [...]}: one result row.
+    - {"type": "module", "module": <module>, "name": <display name>, "rows": <count>, ...}: written when a module
+      finishes, with the module's description, references, remediation, verification commands and table headers.
+    """
+
+    def __init__(self, file):
+        """
+        :param file: Text file object opened for writing.
+        """
+        self.file = file
+        self._lock = threading.Lock()  # Modules run concurrently and share the writer
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        with self._lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def write_scan(self, api_title, target):
+        self._write({"type": "scan", "api_title": api_title, "target": target})
+
+    def write_row(self, module_name, row):
+        self._write({"type": "row", "module": module_name, "row": row})
+
+    def write_module(self, module_name, formatted_results, row_count):
+        # "module" is the key used by the rows, the module's display name goes to "name"
+        entry = {"type": "module", "module": module_name, "name": formatted_results.get("module", module_name), "rows": row_count}
+        entry.update((key, value) for key, value in formatted_results.items() if key != "module")
+        self._write(entry)